@@ -0,0 +1,257 @@
+# headless batch card generation: roster (csv/json/ids table) -> cards, across all cores
+import os, sys, csv, time, shutil, argparse, multiprocessing
+
+from db import DB_PATH, RECORD_FIELDS as FIELDS, init_db
+from roster import count_roster, parse_mapping, read_roster
+from card_core import BATCH_SIZE, CARD_CACHE, ID_SIZE, generate_ids, write_pdf
+from pdf_stream import PAPER, write_cards
+from pdf_vector import BACKEND, VectorCards, card_link, part_path, write_vector_pdf
+from pipeline import Window
+from metrics import drain, merge
+
+# -------- WORKER --------
+_opts = {}
+
+def _init_worker(opts):
+    _opts.update(opts)
+
+def _card_args(rec, sid):
+    if not rec.get("name") or not sid:
+        raise ValueError("name and student_id are required")
+    data = {k: str(rec.get(k) or "") for k in FIELDS}
+    photo = rec.get("photo") or rec.get("photo_path")
+    if photo and _opts.get("photo_dir") and not os.path.isabs(photo):
+        photo = os.path.join(_opts["photo_dir"], photo)
+    return data, _opts.get("bg"), _opts.get("logo"), photo, _opts.get("upload", False)
+
+def _jobs(items):
+    # (idx, rec) -> (idx, sid, card args or the validation error)
+    out = []
+    for idx, rec in items:
+        sid = str(rec.get("student_id") or "").strip()
+        try:
+            out.append((idx, sid, _card_args(rec, sid)))
+        except Exception as e:
+            out.append((idx, sid, e))
+    return out
+
+def _err(e):
+    return f"{type(e).__name__}: {e}"
+
+def _render_many(jobs):
+    # renders the valid jobs as one batch; [image or Exception] aligned with jobs
+    ok = [j for j in jobs if not isinstance(j[2], Exception)]
+    imgs = iter(generate_ids([j[2] for j in ok], cache=_opts.get("cache", True)))
+    return [j[2] if isinstance(j[2], Exception) else next(imgs) for j in jobs]
+
+def render_chunk(items):
+    # runs in a pool process on a batch of records; any failure is reported per record instead of
+    # killing the batch
+    jobs = _jobs(items)
+    fmt = _opts.get("format", "png")
+    if fmt == "pdf" and _opts.get("pdf_backend") == "vector":
+        return [_vector_one(*j) for j in jobs]
+    if _opts.get("cache", True) and CARD_CACHE is not None:
+        # unchanged records are a file copy out of the card cache
+        valid = [j for j in jobs if not isinstance(j[2], Exception)]
+        res = iter(CARD_CACHE.render_many([j[2] for j in valid]))
+        results = [j[2] if isinstance(j[2], Exception) else next(res) for j in jobs]
+    else:
+        results = _render_many(jobs)
+    out = []
+    for (idx, sid, _), r in zip(jobs, results):
+        try:
+            if isinstance(r, Exception):
+                raise r
+            path = os.path.join(_opts["out_dir"], f"{sid}_card.{fmt}")
+            if isinstance(r, tuple):
+                key = r[0]
+                shutil.copyfile(CARD_CACHE.pdf(key) if fmt == "pdf" else CARD_CACHE.png(key), path)
+            elif fmt == "pdf":
+                write_pdf(r, path)
+            else:
+                r.save(path)
+            out.append((idx, sid, path, None))
+        except Exception as e:
+            out.append((idx, sid, None, _err(e)))
+    return out
+
+def _vector_one(idx, sid, args):
+    try:
+        if isinstance(args, Exception):
+            raise args
+        path = os.path.join(_opts["out_dir"], f"{sid}_card.pdf")
+        write_vector_pdf(args[0], path, *args[1:], link=card_link(*args, cache=_opts.get("cache", True)))
+        return idx, sid, path, None
+    except Exception as e:
+        return idx, sid, None, _err(e)
+
+def render_images(items):
+    # like render_chunk, but hands the card images back for the single-PDF writer
+    jobs = _jobs(items)
+    return [(idx, sid, None, _err(r)) if isinstance(r, Exception) else (idx, sid, r, None)
+            for (idx, sid, _), r in zip(jobs, _render_many(jobs))]
+
+def chunk_task(items):
+    # pool tasks return (results, this worker's span stats); the parent merges the stats, so stage
+    # metrics cover the renders and not just the driver (pool workers never run the atexit exporter)
+    return render_chunk(items), drain()
+
+def images_task(items):
+    return render_images(items), drain()
+
+def chunked(records, size):
+    # enumerate(records) in lists of `size`, so each pool task renders a whole batch
+    buf = []
+    for item in enumerate(records):
+        buf.append(item)
+        if len(buf) >= size:
+            yield buf; buf = []
+    if buf:
+        yield buf
+
+# -------- DRIVER --------
+def _window(window, workers, chunksize):
+    # default: two batches per worker in flight; the pool needs a whole chunksize of them to start a task
+    win = window or Window(2 * workers * chunksize)
+    win.size = max(win.size, chunksize)
+    return win
+
+def run_batch(records, out_dir="generated_cards", workers=None, bg=None, logo=None,
+              photo_dir=None, upload=False, total=None, chunksize=1, progress=None, fmt="png", cache=True,
+              batch=BATCH_SIZE, pdf_backend=BACKEND, window=None):
+    os.makedirs(out_dir, exist_ok=True)
+    opts = {"out_dir": os.path.abspath(out_dir), "bg": bg, "logo": logo, "photo_dir": photo_dir,
+            "upload": upload, "format": fmt, "cache": cache, "pdf_backend": pdf_backend}
+    workers = workers or os.cpu_count() or 1
+    win = _window(window, workers, chunksize)
+    done = ok = 0; failures = []
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(opts,)) as pool:
+        for results, stats in pool.imap_unordered(chunk_task, win.feed(chunked(records, batch)), chunksize):
+            win.done(); merge(stats)
+            for idx, sid, out, err in results:
+                done += 1
+                if err:
+                    failures.append((idx, sid, err))
+                else:
+                    ok += 1
+            if progress:
+                progress(done, ok, len(failures), total)
+    return ok, failures
+
+def run_pdf(records, pdf_path, paper=None, workers=None, bg=None, logo=None, photo_dir=None,
+            upload=False, total=None, chunksize=1, progress=None, cache=True, batch=BATCH_SIZE, window=None):
+    # every card into one multi-page (or N-up) PDF, in roster order, written page by page
+    opts = {"bg": bg, "logo": logo, "photo_dir": photo_dir, "upload": upload, "cache": cache}
+    workers = workers or os.cpu_count() or 1
+    win = _window(window, workers, chunksize)
+    failures = []; counts = {"done": 0, "ok": 0}
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(opts,)) as pool:
+        def images():
+            # imap keeps roster order; the window bounds how many rendered batches wait for the writer
+            for results, stats in pool.imap(images_task, win.feed(chunked(records, batch)), chunksize):
+                win.done(); merge(stats)
+                for idx, sid, img, err in results:
+                    counts["done"] += 1
+                    if err:
+                        failures.append((idx, sid, err))
+                    else:
+                        counts["ok"] += 1
+                        yield img
+                if progress:
+                    progress(counts["done"], counts["ok"], len(failures), total)
+        write_cards(images(), pdf_path, ID_SIZE, paper)
+    return counts["ok"], failures
+
+def run_vector_pdf(records, pdf_path, paper=None, bg=None, logo=None, photo_dir=None, upload=False,
+                   total=None, progress=None, cache=True, split=None, window=None):
+    # every card into vector PDFs; drawing is cheap, so this runs in-process, in roster order.
+    # reportlab holds a file in memory until it is saved, so after `split` cards, or once the window's
+    # memory ceiling is reached, output rolls over to <name>-002.pdf, <name>-003.pdf, ... at a page break
+    _init_worker({"bg": bg, "logo": logo, "photo_dir": photo_dir, "upload": upload})
+    done = ok = 0; failures = []; part = 1
+    pdf = VectorCards(pdf_path, paper)
+    try:
+        for idx, sid, args in (job for items in chunked(records, BATCH_SIZE) for job in _jobs(items)):
+            if pdf.count and pdf.page_full and ((split and pdf.count >= split) or (window and window.over())):
+                pdf.close(); part += 1
+                pdf = VectorCards(part_path(pdf_path, part), paper)
+            done += 1
+            try:
+                if isinstance(args, Exception):
+                    raise args
+                pdf.add(*args, link=card_link(*args, cache=cache))
+                ok += 1
+            except Exception as e:
+                failures.append((idx, sid, _err(e)))
+            if progress:
+                progress(done, ok, len(failures), total)
+    finally:
+        pdf.close()
+    return ok, failures
+
+def make_progress(stream=sys.stderr):
+    start = time.time()
+    def report(done, ok, failed, total):
+        rate = done / max(time.time() - start, 1e-6)
+        of = f"/{total}" if total else ""
+        stream.write(f"\r[{done}{of}] ok={ok} failed={failed} {rate:.1f} cards/s")
+        stream.flush()
+    return report
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Render ID cards in bulk without the GUI.")
+    ap.add_argument("roster", nargs="?", help="CSV/JSON/JSONL roster or .db file (default: ids table in %s)" % DB_PATH)
+    ap.add_argument("-o", "--out", default="generated_cards", help="output directory")
+    ap.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    ap.add_argument("--bg", help="background image")
+    ap.add_argument("--logo", help="logo image")
+    ap.add_argument("--photo-dir", help="directory for relative 'photo' roster paths")
+    ap.add_argument("-m", "--map", help='roster column mapping, e.g. "Roll No=student_id,Full Name=name"')
+    ap.add_argument("-f", "--format", choices=("png", "pdf"), default="png", help="card file format")
+    ap.add_argument("--pdf", help="write all cards into this one multi-page PDF instead of per-card files")
+    ap.add_argument("--sheet", choices=sorted(PAPER), type=str.upper, help="with --pdf: N-up cards per A4/LETTER sheet")
+    ap.add_argument("--pdf-backend", choices=("vector", "raster"), default=BACKEND,
+                    help="vector: reportlab text/QR with embedded photos; raster: the PNG card as one image")
+    ap.add_argument("--upload", action="store_true", help="upload cards to imgbb for the QR link")
+    ap.add_argument("--no-cache", action="store_true", help="re-render every card, ignoring the card cache")
+    ap.add_argument("--batch", type=int, default=BATCH_SIZE, help="cards rendered together per worker task")
+    ap.add_argument("--chunksize", type=int, default=1, help="batches handed to a worker at a time")
+    ap.add_argument("--split", type=int, metavar="N", help="with --pdf (vector): start a new file every N cards")
+    ap.add_argument("--max-inflight", type=int, help="batches rendered ahead of the writer (default: 2 per worker)")
+    ap.add_argument("--max-memory", type=float, metavar="MB",
+                    help="stop feeding workers while this process and its workers use more than MB resident")
+    ap.add_argument("--errors", help="write failed records to this CSV")
+    ap.add_argument("-q", "--quiet", action="store_true")
+    a = ap.parse_args(argv)
+
+    if a.roster is None:
+        init_db()
+    records = read_roster(a.roster, parse_mapping(a.map))
+    start = time.time()
+    progress = None if a.quiet else make_progress()
+    window = Window(a.max_inflight or 2 * (a.workers or os.cpu_count() or 1) * a.chunksize, a.max_memory)
+    if a.pdf and a.pdf_backend == "vector":
+        ok, failures = run_vector_pdf(records, a.pdf, a.sheet, a.bg, a.logo, a.photo_dir, a.upload,
+                                      count_roster(a.roster), progress, not a.no_cache, a.split, window)
+    elif a.pdf:
+        ok, failures = run_pdf(records, a.pdf, a.sheet, a.workers, a.bg, a.logo, a.photo_dir,
+                               a.upload, count_roster(a.roster), a.chunksize, progress, not a.no_cache, a.batch, window)
+    else:
+        ok, failures = run_batch(records, a.out, a.workers, a.bg, a.logo, a.photo_dir,
+                                 a.upload, count_roster(a.roster), a.chunksize, progress, a.format, not a.no_cache,
+                                 a.batch, a.pdf_backend, window)
+    if not a.quiet:
+        sys.stderr.write("\n")
+    for idx, sid, err in sorted(failures):
+        print(f"record {idx} ({sid or '?'}): {err}", file=sys.stderr)
+    if a.errors and failures:
+        with open(a.errors, "w", newline="") as f:
+            w = csv.writer(f); w.writerow(["record", "student_id", "error"])
+            w.writerows(sorted(failures))
+    peak = f", peak {window.peak_mb:.0f} MB resident" if window.peak_mb else ""
+    print(f"{ok} cards rendered, {len(failures)} failed in {time.time() - start:.1f}s{peak}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
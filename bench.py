@@ -0,0 +1,195 @@
+# benchmarks for the card pipeline: image utils, generate_id, PNG/PDF output and ids queries
+import os, sys, io, json, time, random, shutil, argparse, platform, tempfile, threading, subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from PIL import Image
+
+import db
+import uploader
+from pdf_vector import write_vector_pdf
+from card_core import make_rounded, make_qr, generate_id, write_pdf
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+# -------- HARNESS --------
+def peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def pct(sorted_vals, p):
+    return sorted_vals[min(len(sorted_vals) - 1, int(round(p / 100 * (len(sorted_vals) - 1))))]
+
+def bench(name, fn, min_time=1.0, min_runs=5, max_runs=10000, warmup=1, **extra):
+    for _ in range(warmup):
+        fn()
+    times, start = [], time.perf_counter()
+    while len(times) < min_runs or (time.perf_counter() - start < min_time and len(times) < max_runs):
+        t = time.perf_counter(); fn(); times.append(time.perf_counter() - t)
+    times.sort()
+    total = sum(times)
+    res = {"name": name, "runs": len(times), "ops_per_s": round(len(times) / total, 2),
+           "mean_ms": round(total / len(times) * 1000, 3), "p50_ms": round(pct(times, 50) * 1000, 3),
+           "p90_ms": round(pct(times, 90) * 1000, 3), "p99_ms": round(pct(times, 99) * 1000, 3),
+           "peak_rss_mb": peak_rss_mb()}
+    res.update(extra)
+    print(f"{name:<32} {res['ops_per_s']:>10.1f}/s  p50 {res['p50_ms']:>9.3f}ms  "
+          f"p90 {res['p90_ms']:>9.3f}ms  p99 {res['p99_ms']:>9.3f}ms  rss {res['peak_rss_mb']}MB")
+    return res
+
+# -------- STAND-IN UPLOAD SERVER --------
+class _StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"data": {"url": "https://i.ibb.co/bench/card.png"}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json"); self.send_header("Content-Length", str(len(body)))
+        self.end_headers(); self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_standin():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+# -------- STAGES --------
+def make_assets(d):
+    paths = {}
+    for name, size, color in (("bg", (1200, 1800), (30, 90, 160)), ("logo", (400, 400), (200, 40, 40)),
+                              ("photo", (600, 800), (120, 160, 90))):
+        paths[name] = os.path.join(d, f"{name}.png")
+        Image.new("RGB", size, color).save(paths[name])
+    return paths
+
+def bench_render(results, assets, min_time):
+    photo = Image.open(assets["photo"]); photo.load()
+    results.append(bench("make_rounded", lambda: make_rounded(photo, (250, 300)), min_time))
+    urls = iter(f"https://i.ibb.co/{i:08d}/card.png" for i in range(10 ** 9))
+    results.append(bench("make_qr (uncached)", lambda: make_qr.__wrapped__(next(urls), 180), min_time))
+    results.append(bench("make_qr (cached)", lambda: make_qr("https://i.ibb.co/x/card.png", 180), min_time))
+
+    srv = start_standin()
+    uploader.set_uploader(uploader.Uploader(f"http://127.0.0.1:{srv.server_address[1]}/", api_key="bench"))
+    data = {"name": "Benchmark Student", "student_id": "B0000001", "course": "BSc CS", "year": "2",
+            "department": "Computer", "phone": "5550100", "email": "bench@uni.edu"}
+    results.append(bench("generate_id (stand-in upload)",
+                         lambda: generate_id(data, assets["bg"], assets["logo"], assets["photo"], cache=False), min_time))
+    results.append(bench("generate_id (no upload)",
+                         lambda: generate_id(data, assets["bg"], assets["logo"], assets["photo"], upload=False,
+                                             cache=False), min_time))
+    results.append(bench("generate_id (preview, no save)",
+                         lambda: generate_id(data, assets["bg"], assets["logo"], assets["photo"], upload=False,
+                                             cache=False, save=False), min_time))
+    results.append(bench("generate_id (card cache hit)",
+                         lambda: generate_id(data, assets["bg"], assets["logo"], assets["photo"]), min_time))
+    uploader.set_uploader(None); srv.shutdown()
+
+    card = generate_id(data, assets["bg"], assets["logo"], assets["photo"], upload=False, cache=False)
+    results.append(bench("png save", lambda: card.save(io.BytesIO(), "PNG"), min_time))
+    results.append(bench("pdf export (reportlab)", lambda: write_pdf(card, io.BytesIO()), min_time))
+    # vector backend from the record: text, QR encode + vector modules and the embedded photo
+    results.append(bench("pdf card (vector)", lambda: write_vector_pdf(data, io.BytesIO(), assets["bg"], assets["logo"],
+                                                                        assets["photo"], upload=False), min_time))
+
+def bench_startup(results, min_time):
+    # cold interpreter + import; the headless core must stay well under the full GUI app
+    here = os.path.dirname(os.path.abspath(__file__))
+    for mod in ("card_core", "python_mini_project_app"):
+        cmd = [sys.executable, "-c", f"import {mod}"]
+        if subprocess.run(cmd, cwd=here, capture_output=True).returncode != 0:
+            print(f"startup: import {mod:<24} skipped (import failed)")
+            continue
+        results.append(bench(f"startup: import {mod}", lambda: subprocess.run(cmd, cwd=here, check=True),
+                             min_time, max_runs=50))
+
+def fill_db(path, rows):
+    db.init_db(path)
+    d = db.get_db(path)
+    have = db.count_records(path)
+    depts = ("Computer", "IT", "ECS", "EXTC", "Mechanical")
+    d.executemany(db.INSERT_RECORD, ((f"Student {i} {random.choice(('Shah', 'Rao', 'Iyer', 'Das'))}",
+                                      f"S{i:07d}", "BSc", str(i % 4 + 1), depts[i % 5], "", f"s{i}@uni.edu", "")
+                                     for i in range(have, rows)), chunk=20000)
+
+def bench_queries(results, d, sizes, min_time):
+    for rows in sizes:
+        path = os.path.join(d, f"ids_{rows}.db")
+        t = time.perf_counter(); fill_db(path, rows)
+        print(f"-- ids table with {rows} rows (built in {time.perf_counter() - t:.1f}s)")
+        rnd = random.Random(1)
+        tag = {"rows": rows}
+        results.append(bench(f"load_records first page [{rows}]", lambda: db.page_records(limit=200, path=path), min_time, **tag))
+        results.append(bench(f"load_records sort by name [{rows}]",
+                             lambda: db.page_records("name", True, limit=200, path=path), min_time, **tag))
+        results.append(bench(f"search_record by student_id [{rows}]",
+                             lambda: db.get_db(path).query("SELECT * FROM ids WHERE student_id=?",
+                                                           (f"S{rnd.randrange(rows):07d}",)), min_time, **tag))
+        results.append(bench(f"search_records text [{rows}]",
+                             lambda: db.search_records(f"student {rnd.randrange(rows)}", path=path), min_time, **tag))
+        db.get_db(path).close()
+
+# -------- REPORT --------
+def git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        return None
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        base = {r["name"]: r for r in json.load(f)["results"]}
+    print(f"\n{'stage':<40} {'base p50':>10} {'now p50':>10} {'change':>8}")
+    for r in results:
+        b = base.get(r["name"])
+        if b and b["p50_ms"]:
+            print(f"{r['name']:<40} {b['p50_ms']:>10.3f} {r['p50_ms']:>10.3f} {r['p50_ms'] / b['p50_ms'] - 1:>+8.1%}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the card rendering and export pipeline.")
+    ap.add_argument("--rows", default="1000,100000,1000000", help="comma-separated ids table sizes")
+    ap.add_argument("--min-time", type=float, default=1.0, help="seconds spent per stage")
+    ap.add_argument("--skip-startup", action="store_true")
+    ap.add_argument("--skip-render", action="store_true")
+    ap.add_argument("--skip-db", action="store_true")
+    ap.add_argument("--json", help="write results to this JSON file")
+    ap.add_argument("--compare", help="baseline JSON from an earlier run")
+    ap.add_argument("--keep", help="build the test databases here and keep them between runs")
+    a = ap.parse_args(argv)
+
+    work = tempfile.mkdtemp(prefix="eduid_bench_")
+    cwd = os.getcwd()
+    os.chdir(work)   # generate_id writes generated_cards/ into the working directory
+    results = []
+    try:
+        if not a.skip_startup:
+            bench_startup(results, a.min_time)
+        if not a.skip_render:
+            bench_render(results, make_assets(work), a.min_time)
+        if not a.skip_db:
+            dbdir = os.path.abspath(os.path.join(cwd, a.keep)) if a.keep else work
+            os.makedirs(dbdir, exist_ok=True)
+            bench_queries(results, dbdir, [int(x) for x in a.rows.split(",") if x], a.min_time)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work, ignore_errors=True)
+
+    report = {"commit": git_rev(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+              "platform": platform.platform(), "cpus": os.cpu_count(), "results": results}
+    if a.json:
+        with open(a.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if a.compare:
+        compare(results, a.compare)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,577 @@
+# Qt-free card core: fonts, assets, QR, generate_id and PDF output, importable by headless workers
+import os, io, json, time, hashlib, tempfile, threading
+from collections import OrderedDict
+from functools import lru_cache
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+from metrics import span
+
+# -------- CONFIG --------
+ID_SIZE = (630, 1000)
+
+# -------- FONTS --------
+# searched in order for font files given by bare name; extend via EDUID_FONT_PATH or set_font_path()
+FONT_PATH = [d for d in os.environ.get("EDUID_FONT_PATH", "").split(os.pathsep) if d] + [
+    os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts"),
+    "/Library/Fonts", "/usr/share/fonts/truetype/msttcorefonts", "/usr/share/fonts/truetype",
+    "/usr/share/fonts/truetype/dejavu", "/usr/share/fonts/dejavu-sans-fonts", "/usr/share/fonts/TTF",
+    "/usr/share/fonts/truetype/liberation"]
+# metric-compatible (Liberation) or common (DejaVu) stand-ins, tried when the named font isn't installed
+FONT_SUBSTITUTES = {"arial.ttf": ("LiberationSans-Regular.ttf", "DejaVuSans.ttf"),
+                    "arialbd.ttf": ("LiberationSans-Bold.ttf", "DejaVuSans-Bold.ttf")}
+_font_files = {}   # name -> resolved path (None when not found)
+_fonts = {}        # (path, size) -> FreeTypeFont
+
+def set_font_path(dirs):
+    FONT_PATH[:] = list(dirs)
+    _font_files.clear(); _fonts.clear()
+
+def find_font(name):
+    if name not in _font_files:
+        path = None
+        if os.path.isabs(name) and os.path.exists(name):
+            path = name
+        else:
+            for n in (name,) + FONT_SUBSTITUTES.get(name.lower(), ()):
+                path = next((os.path.join(d, n) for d in FONT_PATH if os.path.exists(os.path.join(d, n))), None)
+                if path:
+                    break
+        _font_files[name] = path
+    return _font_files[name]
+
+def get_font(name, size):
+    # fonts are loaded once per process; a missing font falls back to PIL's default (at the asked size) once,
+    # not per card
+    key = (find_font(name) or name, size)
+    font = _fonts.get(key)
+    if font is None:
+        try:
+            font = ImageFont.truetype(key[0], size)
+        except OSError:
+            font = ImageFont.load_default(size)
+        _fonts[key] = font
+    return font
+
+# -------- IMAGE UTILS --------
+MASK_SS = 4   # supersampling factor for the anti-aliased ellipse masks
+
+@lru_cache(maxsize=32)
+def round_mask(size):
+    # ellipse drawn at MASK_SS x the size and box-filtered down: soft edges, built once per size.
+    # Cached and shared: don't draw on it.
+    w, h = size
+    big = Image.new("L", (w * MASK_SS, h * MASK_SS), 0)
+    ImageDraw.Draw(big).ellipse((0, 0, w * MASK_SS - 1, h * MASK_SS - 1), fill=255)
+    return big.resize(size, Image.Resampling.BOX)
+
+def make_rounded(img: Image.Image, size):
+    img = img.convert("RGBA").resize(size, Image.Resampling.LANCZOS)
+    mask = round_mask(tuple(size))
+    if img.getextrema()[3][0] < 255:   # transparent logo/photo: keep its own alpha inside the ellipse
+        mask = ImageChops.multiply(img.getchannel("A"), mask)
+    img.putalpha(mask)
+    return img
+
+class AssetCache:
+    # LRU of decoded, resized (and optionally rounded) RGBA assets keyed by path + mtime + size.
+    # Returned images are shared: paste from them, copy() before drawing on them.
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = self.hits = self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, size, rounded=False):
+        size = tuple(size)
+        key = (os.path.abspath(path), os.path.getmtime(path), size, rounded)
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key); self.hits += 1
+                return img
+            self.misses += 1
+        with Image.open(path) as src:
+            img = make_rounded(src, size) if rounded else src.convert("RGBA").resize(size)
+        nbytes = img.width * img.height * len(img.getbands())
+        if nbytes <= self.max_bytes:
+            with self._lock:
+                if key not in self._items:
+                    self._items[key] = img; self.bytes += nbytes
+                while self.bytes > self.max_bytes:
+                    _, old = self._items.popitem(last=False)
+                    self.bytes -= old.width * old.height * len(old.getbands())
+        return img
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._items),
+                "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self._lock:
+            self._items.clear(); self.bytes = 0
+
+ASSET_CACHE = AssetCache(int(os.environ.get("EDUID_ASSET_CACHE_MB", "64")) * 1024 * 1024)
+
+QR_QUIET = 2      # minimum quiet zone, in modules
+QR_MIN_BOX = 3    # smallest module size (px) worth keeping a stronger error correction level for
+
+def qr_matrix(text, size):
+    import qrcode   # lazy: only needed once a card is actually rendered
+    # strongest error correction whose modules still get QR_MIN_BOX px at this size
+    for ec in (qrcode.constants.ERROR_CORRECT_H, qrcode.constants.ERROR_CORRECT_Q,
+               qrcode.constants.ERROR_CORRECT_M, qrcode.constants.ERROR_CORRECT_L):
+        qr = qrcode.QRCode(error_correction=ec, border=0)
+        qr.add_data(text); qr.make(fit=True)
+        matrix = qr.get_matrix()
+        if size // (len(matrix) + 2 * QR_QUIET) >= QR_MIN_BOX:
+            break
+    return matrix
+
+@lru_cache(maxsize=256)
+def make_qr(text, size=150):
+    # every module is exactly `box` px; leftover pixels go to the quiet zone, never to resampling.
+    # The result is cached and shared: paste it, don't draw on it.
+    matrix = qr_matrix(text, size)
+    n = len(matrix)
+    box = size // (n + 2 * QR_QUIET)
+    mods = Image.frombytes("L", (n, n), bytes(0 if m else 255 for row in matrix for m in row))
+    if box < 1:   # payload too long for this size: fall back to a plain downscale
+        return mods.resize((size, size)).convert("RGBA")
+    qr = Image.new("L", (size, size), 255)
+    off = (size - n * box) // 2
+    qr.paste(mods.resize((n * box, n * box), Image.Resampling.NEAREST), (off, off))
+    return qr.convert("RGBA")
+
+# -------- UPLOAD TO IMGBB --------
+def upload_to_imgbb(local_path):
+    # pooled session, timeouts and retries live in uploader.py; endpoint via EDUID_UPLOAD_URL.
+    # Imported lazily so renders without uploads never load requests.
+    from uploader import get_uploader
+    return get_uploader().upload(local_path)
+
+def _submit_upload(local_path):
+    # same upload on the uploader's bounded thread pool; a future of the link (None on failure)
+    from uploader import get_uploader
+    return get_uploader().submit(local_path)
+
+# -------- ID GENERATION --------
+Y_PHOTO = 150
+Y_NAME = Y_PHOTO + 320
+Y_INFO = Y_NAME + 90
+PHOTO_SIZE = (250, 300)
+PHOTO_XY = ((ID_SIZE[0] - PHOTO_SIZE[0]) // 2, Y_PHOTO)
+INFO_FIELDS = [("ID", "student_id"), ("Course", "course"), ("Year", "year"),
+               ("Department", "department"), ("Phone", "phone"), ("Email", "email")]
+
+_templates = OrderedDict()   # (bg, logo) file keys -> static base layer
+_templates_lock = threading.Lock()
+TEMPLATE_CACHE_SIZE = 8
+
+def _file_key(path):
+    if path and os.path.exists(path):
+        return os.path.abspath(path), os.path.getmtime(path)
+    return None
+
+def _px(v, scale):
+    # a layout length at this render scale (1 = the full-size card)
+    return v if scale == 1 else max(1, round(v * scale))
+
+def build_template(bg_path=None, logo_path=None, scale=1):
+    # everything identical on every card: background, header, logo and field labels
+    W, H = _px(ID_SIZE[0], scale), _px(ID_SIZE[1], scale)
+    if bg_path and os.path.exists(bg_path):
+        # over white, like the vector backend's page: transparent parts don't come out black
+        bg = Image.alpha_composite(Image.new("RGBA", (W, H), "white"), ASSET_CACHE.get(bg_path, (W, H)))
+    else:
+        bg = Image.new("RGBA", (W, H), "white")
+
+    d = ImageDraw.Draw(bg)
+    f_title = get_font("arialbd.ttf", _px(48, scale))
+    f_info = get_font("arial.ttf", _px(26, scale))
+
+    # Header
+    text = "STUDENT"
+    w_text = d.textlength(text, font=f_title)
+    d.text(((W - w_text)//2, _px(40, scale)), text, font=f_title, fill="black")
+
+    # Logo
+    if logo_path and os.path.exists(logo_path):
+        logo = ASSET_CACHE.get(logo_path, (_px(120, scale),) * 2, rounded=True)
+        bg.paste(logo, (_px(25, scale),) * 2, logo)
+
+    # Info labels
+    for i, (label, _) in enumerate(INFO_FIELDS):
+        d.text((_px(50, scale), _px(Y_INFO + 45 * i, scale)), f"{label}: ", font=f_info, fill="black")
+    return bg
+
+def get_template(bg_path=None, logo_path=None, scale=1):
+    key = (_file_key(bg_path), _file_key(logo_path), scale)
+    with _templates_lock:
+        base = _templates.get(key)
+        if base is not None:
+            _templates.move_to_end(key)
+            return base
+    base = build_template(bg_path, logo_path, scale)
+    with _templates_lock:
+        _templates[key] = base
+        while len(_templates) > TEMPLATE_CACHE_SIZE:
+            _templates.popitem(last=False)
+    return base
+
+def generate_id(data, bg_path=None, logo_path=None, photo_path=None, upload=True, cache=True, save=True):
+    # with cache on, unchanged cards come back from CARD_CACHE without re-rendering or re-uploading.
+    # save=False skips the copy in generated_cards (live previews, the HTTP service).
+    with span("generate_id"):
+        if cache and CARD_CACHE is not None:
+            key, _, img = CARD_CACHE.render(data, bg_path, logo_path, photo_path, upload, save)
+            if img is not None:   # a miss hands back the card it just rendered
+                return img
+            with Image.open(CARD_CACHE.png(key)) as img:
+                return img.convert("RGB")
+        return _generate_id(data, bg_path, logo_path, photo_path, upload, save)[0]
+
+def local_card_path(data):
+    return os.path.abspath(os.path.join("generated_cards", f"{data.get('student_id','temp')}_card.png"))
+
+def local_link(data):
+    # QR link used when the card isn't uploaded
+    return f"file:///{local_card_path(data).replace(os.sep, '/')}"
+
+def _generate_id(data, bg_path, logo_path, photo_path, upload, save=True):
+    # -> (RGB image, link, that card's PNG bytes or None)
+    bg = _draw_card(data, bg_path, logo_path, photo_path)
+
+    # Upload to imgbb: the card without its QR is saved and sent first (from a private temp dir when the
+    # card isn't to be saved in generated_cards)
+    link = None
+    if upload and save:
+        local_path = _save_local(bg, data)
+        with span("render.upload"):
+            link = upload_to_imgbb(local_path)
+    elif upload:
+        with tempfile.TemporaryDirectory(prefix="eduid_") as d:
+            local_path = os.path.join(d, os.path.basename(local_card_path(data)))
+            with open(local_path, "wb") as f:
+                f.write(_encode_png(bg))
+            with span("render.upload"):
+                link = upload_to_imgbb(local_path)
+    return _add_qr(bg, data, link, save)
+
+def _draw_card(data, bg_path, logo_path, photo_path, scale=1):
+    # everything but the QR: template, photo and text
+    W = _px(ID_SIZE[0], scale)
+    with span("render.template"):
+        bg = get_template(bg_path, logo_path, scale).copy()
+
+    # Photo
+    if photo_path and os.path.exists(photo_path):
+        with span("render.photo"):
+            photo = ASSET_CACHE.get(photo_path, [_px(v, scale) for v in PHOTO_SIZE], rounded=True)
+            bg.paste(photo, tuple(_px(v, scale) for v in PHOTO_XY), photo)
+
+    with span("render.fonts"):
+        d = ImageDraw.Draw(bg)
+        f_name = get_font("arialbd.ttf", _px(40, scale))
+        f_info = get_font("arial.ttf", _px(26, scale))
+
+    with span("render.text"):
+        # Student Name
+        name = data.get("name", "")
+        w_name = d.textlength(name, font=f_name)
+        d.text(((W - w_name)//2, _px(Y_NAME, scale)), name, font=f_name, fill="black")
+
+        # Info values, drawn after the cached "Label: " text
+        for i, (label, key) in enumerate(INFO_FIELDS):
+            x = _px(50, scale) + d.textlength(f"{label}: ", font=f_info)
+            d.text((x, _px(Y_INFO + 45 * i, scale)), data.get(key) or "", font=f_info, fill="black")
+
+    return bg
+
+def render_preview(data, bg_path=None, logo_path=None, photo_path=None, size=ID_SIZE):
+    # the card drawn directly at the largest scale that fits size (a preview label): no full-size
+    # render, downscale, PNG encode or file. Its QR holds the local link, like an un-uploaded card.
+    scale = min(1, size[0] / ID_SIZE[0], size[1] / ID_SIZE[1])
+    with span("render_preview"):
+        return _add_qr(_draw_card(data, bg_path, logo_path, photo_path, scale), data, None, False, scale)[0]
+
+def _encode_png(img):
+    with span("render.save_png"):
+        buf = io.BytesIO()
+        img.save(buf, "PNG")
+        return buf.getvalue()
+
+def _save_local(img, data, png=None):
+    # Save ID image locally, through a temp file: concurrent renders of one student_id each replace
+    # the whole file instead of writing into each other's
+    local_path = local_card_path(data)
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    tmp = f"{local_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(png or _encode_png(img))
+    os.replace(tmp, local_path)
+    return local_path
+
+def _add_qr(bg, data, link, save=True, scale=1):
+    # the QR for the uploaded link, or for the local file when there is none; a card with a local link
+    # is saved (once, QR included) to generated_cards unless save is False.
+    # Returns (RGB image, link, its PNG bytes or None).
+    W = _px(ID_SIZE[0], scale)
+    png = None
+    if not link:
+        link = local_link(data)
+
+    with span("render.qr"):
+        qr = make_qr(link, size=_px(180, scale))
+        bg.paste(qr, (W - qr.width - _px(40, scale), _px(Y_NAME + 110, scale)), qr)
+
+    with span("render.convert"):
+        img = bg.convert("RGB")
+    if save and link == local_link(data):
+        png = _encode_png(img)
+        _save_local(img, data, png)
+    return img, link, png
+
+# -------- BATCH RENDERING --------
+BATCH_SIZE = 16   # cards rendered together per render_batch call
+
+def render_batch(jobs):
+    # jobs: [(data, bg, logo, photo, upload)] -> [(image, link, png) or the Exception that job raised].
+    # Each card's upload goes to the uploader's thread pool as soon as it is drawn, so the round-trips
+    # overlap with drawing the rest of the batch; the QR goes on once the link is back.
+    drawn, uploading = [], {}   # local PNG path -> its upload, so a repeated student_id waits its turn
+    for data, bg, logo, photo, upload in jobs:
+        try:
+            prev = uploading.pop(local_card_path(data), None)
+            if prev is not None:
+                prev.exception()   # don't overwrite a PNG that is still being sent
+            card = _draw_card(data, bg, logo, photo)
+            fut = None
+            if upload:
+                fut = uploading[local_card_path(data)] = _submit_upload(_save_local(card, data))
+            drawn.append((card, data, fut))
+        except Exception as e:
+            drawn.append(e)
+    out = []
+    for d in drawn:
+        if isinstance(d, Exception):
+            out.append(d); continue
+        card, data, upload = d
+        try:
+            link = None
+            if upload is not None:
+                with span("render.upload_wait"):
+                    link = upload.result()
+            out.append(_add_qr(card, data, link))
+        except Exception as e:
+            out.append(e)
+    return out
+
+def generate_ids(jobs, cache=True):
+    # batch counterpart of generate_id: [image or Exception] in job order
+    with span("generate_ids"):
+        if not (cache and CARD_CACHE is not None):
+            return [r if isinstance(r, Exception) else r[0] for r in render_batch(jobs)]
+        out = []
+        for r in CARD_CACHE.render_many(jobs):
+            if isinstance(r, Exception):
+                out.append(r)
+            elif r[2] is not None:   # a miss: the card it just rendered
+                out.append(r[2])
+            else:
+                with Image.open(CARD_CACHE.png(r[0])) as img:
+                    out.append(img.convert("RGB"))
+        return out
+
+# -------- CARD CACHE --------
+LAYOUT_VERSION = 4   # bump whenever generate_id draws something different for the same inputs
+_digests = {}        # (path, mtime, size) -> sha256 of the file
+
+def file_digest(path):
+    if not path or not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    k = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    if k not in _digests:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _digests[k] = h.hexdigest()
+    return _digests[k]
+
+class CardCache:
+    # content-addressed store of finished cards: <key>.png, <key>.json (QR link) and, on demand, <key>.pdf.
+    # The key hashes the record fields, the asset file contents and LAYOUT_VERSION. Kept under max_bytes
+    # by prune(), least recently used cards first (a hit touches the .json).
+    def __init__(self, root, max_bytes=None):
+        self.root, self.max_bytes = root, max_bytes
+        self.hits = self.misses = 0
+        self._written = 0   # bytes stored by this process since its last prune
+
+    def key(self, data, bg_path=None, logo_path=None, photo_path=None):
+        blob = json.dumps({"v": LAYOUT_VERSION, "data": {k: data[k] for k in sorted(data)},
+                           "bg": file_digest(bg_path), "logo": file_digest(logo_path),
+                           "photo": file_digest(photo_path)}, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, key[:2], f"{key}.{ext}")
+
+    def png(self, key):
+        return self._path(key, "png")
+
+    def link(self, key, upload=False):
+        # the stored QR link, or None on a miss; a local file:// link doesn't satisfy an upload request
+        try:
+            with open(self._path(key, "json")) as f:
+                link = json.load(f)["link"]
+        except (OSError, ValueError, KeyError):
+            return None
+        if not os.path.exists(self.png(key)) or (upload and link.startswith("file:")):
+            return None
+        try:
+            os.utime(self._path(key, "json"))   # last use, for prune()
+        except OSError:
+            pass
+        return link
+
+    def _write(self, path, save):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        base, ext = os.path.splitext(path)
+        tmp = f"{base}.{os.getpid()}-{threading.get_ident()}.tmp{ext}"   # keeps the extension for PIL
+        save(tmp)
+        os.replace(tmp, path)   # concurrent writers of the same key just overwrite identical output
+
+    def put(self, key, img, link, data=None, png=None):
+        # png: this card already encoded (see _add_qr), written as-is instead of encoding again. Never a
+        # path under generated_cards: another render of the same student_id may have replaced that file.
+        def save_png(p):
+            with open(p, "wb") as f:
+                f.write(png)
+        self._write(self.png(key), save_png if png else img.save)
+        meta = {"link": link, "student_id": (data or {}).get("student_id"), "created": time.time()}
+        def save_meta(p):
+            with open(p, "w") as f:
+                json.dump(meta, f)
+        self._write(self._path(key, "json"), save_meta)
+        self._written += os.path.getsize(self.png(key))
+        if self.max_bytes and self._written > self.max_bytes // 8:
+            self.prune()
+
+    def prune(self, max_bytes=None):
+        # drop least recently used cards until the cache is under 90% of max_bytes, plus leftover temp
+        # files; returns (cards removed, bytes left)
+        max_bytes = max_bytes or self.max_bytes
+        self._written = 0
+        entries, total, now = {}, 0, time.time()
+        for d, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(d, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if ".tmp." in name:
+                    if now - st.st_mtime > 3600:   # a writer that died mid-save
+                        _unlink(path)
+                    continue
+                e = entries.setdefault(name.partition(".")[0], [0, 0, []])
+                e[1] += st.st_size; e[2].append(path)
+                if name.endswith(".json"):
+                    e[0] = st.st_mtime
+                total += st.st_size
+        removed = 0
+        if max_bytes and total > max_bytes:
+            for _, size, paths in sorted(entries.values(), key=lambda e: e[0]):
+                if total <= max_bytes * 0.9:
+                    break
+                for path in paths:
+                    _unlink(path)
+                total -= size; removed += 1
+        return removed, total
+
+    def render(self, data, bg_path=None, logo_path=None, photo_path=None, upload=True, save=True):
+        # returns (key, link, image), rendering and storing the card only if it isn't cached yet; image is
+        # the card just rendered on a miss and None on a hit
+        key = self.key(data, bg_path, logo_path, photo_path)
+        link = self.link(key, upload)
+        if link is not None:
+            self.hits += 1
+            return key, link, None
+        self.misses += 1
+        img, link, png = _generate_id(data, bg_path, logo_path, photo_path, upload, save)
+        self.put(key, img, link, data, png)
+        return key, link, img
+
+    def render_many(self, jobs):
+        # batch render(): misses go through render_batch together; [(key, link, image) or Exception] in job order
+        out, miss = [None] * len(jobs), []
+        for i, job in enumerate(jobs):
+            try:
+                key = self.key(*job[:4])
+            except Exception as e:
+                out[i] = e; continue
+            link = self.link(key, job[4])
+            if link is None:
+                miss.append((i, key))
+            else:
+                self.hits += 1; out[i] = (key, link, None)
+        self.misses += len(miss)
+        for (i, key), r in zip(miss, render_batch([jobs[i] for i, _ in miss])):
+            if not isinstance(r, Exception):
+                try:
+                    self.put(key, r[0], r[1], jobs[i][0], r[2])
+                    r = (key, r[1], r[0])
+                except OSError as e:
+                    r = e
+            out[i] = r
+        return out
+
+    def pdf(self, key):
+        path = self._path(key, "pdf")
+        if not os.path.exists(path):
+            with Image.open(self.png(key)) as img:
+                img = img.convert("RGB")
+                self._write(path, lambda p: write_pdf(img, p))
+        return path
+
+def _unlink(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+_cache_dir = os.environ.get("EDUID_CARD_CACHE", "card_cache")   # set to "" to disable
+CARD_CACHE_MB = int(os.environ.get("EDUID_CARD_CACHE_MB", "1024"))   # 0: no size limit
+CARD_CACHE = CardCache(_cache_dir, CARD_CACHE_MB * 1024 * 1024) if _cache_dir else None
+
+# -------- PDF EXPORT --------
+def write_pdf(img, out):
+    # out is a path or any binary file-like object; the PIL image goes to reportlab in memory
+    from reportlab.pdfgen import canvas   # lazy: reportlab is only loaded for PDF output
+    from reportlab.lib.utils import ImageReader
+    with span("pdf.write"):
+        c = canvas.Canvas(out, pagesize=(ID_SIZE[0], ID_SIZE[1]))
+        c.drawImage(ImageReader(img), 0, 0, width=ID_SIZE[0], height=ID_SIZE[1])
+        c.save()
+
+def pdf_bytes(img):
+    buf = io.BytesIO()
+    write_pdf(img, buf)
+    return buf.getvalue()
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="Card cache maintenance.")
+    ap.add_argument("command", choices=("prune-cache",))
+    ap.add_argument("--max-mb", type=int, default=CARD_CACHE_MB, help="size to prune the card cache down to")
+    a = ap.parse_args(argv)
+    if CARD_CACHE is None:
+        print("Card cache is disabled (EDUID_CARD_CACHE is empty)")
+        return 0
+    removed, left = CARD_CACHE.prune(a.max_mb * 1024 * 1024)
+    print(f"{removed} cards removed, {left / (1024 * 1024):.1f} MB left in {CARD_CACHE.root}")
+    return 0
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,302 @@
+# shared SQLite data access: one long-lived connection per thread, WAL mode, batch transactions
+import os, re, sys, sqlite3, threading
+from contextlib import contextmanager
+
+DB_PATH = os.environ.get("EDUID_DB", "eduid_maker.db")
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",        # readers no longer block the writer (and vice versa)
+    "PRAGMA synchronous=NORMAL",      # safe with WAL, avoids an fsync per commit
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",       # ~20 MB page cache per connection
+)
+STATEMENT_CACHE = 256                 # prepared statements kept per connection, keyed by SQL text
+RECORD_FIELDS = ("name", "student_id", "course", "year", "department", "phone", "email")
+RECORD_COLUMNS = "id,name,student_id,course,year,department,phone,email,pdf_path"
+SORT_COLUMNS = RECORD_COLUMNS.split(",")[1:]   # page_records sorts on these through idx_ids_sort_*
+
+# one row per student_id: saving an existing student updates it, keeping a known pdf_path
+INSERT_RECORD = """INSERT INTO ids(name,student_id,course,year,department,phone,email,pdf_path)
+                   VALUES(?,?,?,?,?,?,?,?)
+                   ON CONFLICT(student_id) DO UPDATE SET
+                     name=excluded.name, course=excluded.course, year=excluded.year,
+                     department=excluded.department, phone=excluded.phone, email=excluded.email,
+                     pdf_path=CASE WHEN excluded.pdf_path<>'' THEN excluded.pdf_path ELSE ids.pdf_path END"""
+
+class Database:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conns = []
+        self._lock = threading.Lock()
+
+    def conn(self):
+        # each thread (and each forked process) gets its own connection, reused across calls
+        c = getattr(self._local, "conn", None)
+        if c is None or self._local.pid != os.getpid():
+            c = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                                cached_statements=STATEMENT_CACHE)
+            for p in PRAGMAS:
+                c.execute(p)
+            self._local.conn, self._local.pid, self._local.depth = c, os.getpid(), 0
+            with self._lock:
+                self._conns.append(c)
+        return c
+
+    def execute(self, sql, params=()):
+        return self.conn().execute(sql, params)
+
+    def query(self, sql, params=()):
+        return self.conn().execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        return self.conn().execute(sql, params).fetchone()
+
+    def iter(self, sql, params=(), batch=500):
+        cur = self.conn().execute(sql, params)
+        for rows in iter(lambda: cur.fetchmany(batch), []):
+            yield from rows
+
+    @contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE ... COMMIT, rolled back on error; nested calls join the outer transaction
+        c = self.conn()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield c
+            finally:
+                self._local.depth -= 1
+            return
+        c.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield c
+            c.execute("COMMIT")
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        finally:
+            self._local.depth = 0
+
+    def executemany(self, sql, rows, chunk=1000):
+        # one transaction per chunk of rows; returns the number of rows sent
+        n, buf = 0, []
+        for r in rows:
+            buf.append(r)
+            if len(buf) >= chunk:
+                with self.transaction() as c:
+                    c.executemany(sql, buf)
+                n += len(buf); buf = []
+        if buf:
+            with self.transaction() as c:
+                c.executemany(sql, buf)
+            n += len(buf)
+        return n
+
+    def close(self):
+        with self._lock:
+            for c in self._conns:
+                c.close()
+            self._conns.clear()
+        self._local = threading.local()
+
+_dbs = {}
+_dbs_lock = threading.Lock()
+
+def get_db(path=None):
+    path = path or DB_PATH
+    with _dbs_lock:
+        if path not in _dbs:
+            _dbs[path] = Database(path)
+        return _dbs[path]
+
+# -------- SCHEMA --------
+def init_db(path=None):
+    db = get_db(path)
+    with db.transaction() as c:
+        c.execute("""CREATE TABLE IF NOT EXISTS users(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            email TEXT,
+            password TEXT)""")
+        c.execute("""CREATE TABLE IF NOT EXISTS ids(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            student_id TEXT,
+            course TEXT,
+            year TEXT,
+            department TEXT,
+            phone TEXT,
+            email TEXT,
+            pdf_path TEXT)""")
+    migrate(path)
+
+# -------- MIGRATIONS --------
+# applied in order on init_db; PRAGMA user_version records how many have run.
+# A step is SQL text or a function taking the connection.
+def _set_aside_duplicates(c):
+    # before migration 1 makes student_id unique, every row but the newest per student_id moves to
+    # ids_duplicates (nothing is deleted). The newest row takes over an older saved pdf_path only from a
+    # row with the very same fields (Save as PDF, then Save in Records left it empty), never from another person.
+    c.execute("CREATE TABLE IF NOT EXISTS ids_duplicates AS SELECT * FROM ids WHERE 0")
+    same = " AND ".join(f"d.{k} IS ids.{k}" for k in RECORD_FIELDS)
+    c.execute(f"""UPDATE ids SET pdf_path=(
+                    SELECT d.pdf_path FROM ids d WHERE {same} AND d.id<ids.id AND COALESCE(d.pdf_path,'')<>''
+                    ORDER BY d.id DESC LIMIT 1)
+                  WHERE COALESCE(pdf_path,'')='' AND id IN (SELECT MAX(id) FROM ids GROUP BY student_id)
+                    AND EXISTS (SELECT 1 FROM ids d WHERE {same} AND d.id<ids.id AND COALESCE(d.pdf_path,'')<>'')""")
+    older = "student_id IS NOT NULL AND id NOT IN (SELECT MAX(id) FROM ids GROUP BY student_id)"
+    c.execute(f"INSERT INTO ids_duplicates SELECT * FROM ids WHERE {older}")
+    n = c.execute(f"DELETE FROM ids WHERE {older}").rowcount
+    if n:
+        print(f"Moved {n} duplicate student_id rows to ids_duplicates; the newest row per student_id stays in ids",
+              file=sys.stderr)
+
+MIGRATIONS = [
+    # 1: unique, indexed student_id (older duplicates are set aside in ids_duplicates, see _set_aside_duplicates)
+    (_set_aside_duplicates,
+     "CREATE UNIQUE INDEX IF NOT EXISTS idx_ids_student_id ON ids(student_id)"),
+    # 2: full-text search over name/email/course/department, kept in sync by triggers
+    ("""CREATE VIRTUAL TABLE IF NOT EXISTS ids_fts USING fts5(
+          name, email, course, department, content='ids', content_rowid='id')""",
+     """CREATE TRIGGER IF NOT EXISTS ids_fts_ai AFTER INSERT ON ids BEGIN
+          INSERT INTO ids_fts(rowid,name,email,course,department)
+          VALUES(new.id,new.name,new.email,new.course,new.department); END""",
+     """CREATE TRIGGER IF NOT EXISTS ids_fts_ad AFTER DELETE ON ids BEGIN
+          INSERT INTO ids_fts(ids_fts,rowid,name,email,course,department)
+          VALUES('delete',old.id,old.name,old.email,old.course,old.department); END""",
+     """CREATE TRIGGER IF NOT EXISTS ids_fts_au AFTER UPDATE ON ids BEGIN
+          INSERT INTO ids_fts(ids_fts,rowid,name,email,course,department)
+          VALUES('delete',old.id,old.name,old.email,old.course,old.department);
+          INSERT INTO ids_fts(rowid,name,email,course,department)
+          VALUES(new.id,new.name,new.email,new.course,new.department); END""",
+     "INSERT INTO ids_fts(ids_fts) VALUES('rebuild')"),
+    # 3: persistent render queue (jobs.py); one row per card per batch
+    ("""CREATE TABLE IF NOT EXISTS render_jobs(
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          batch TEXT NOT NULL,
+          student_id TEXT NOT NULL,
+          format TEXT NOT NULL DEFAULT 'pdf',
+          out_path TEXT NOT NULL,
+          bg TEXT, logo TEXT,
+          upload INTEGER NOT NULL DEFAULT 0,
+          status TEXT NOT NULL DEFAULT 'pending',   -- pending | running | done | failed
+          attempts INTEGER NOT NULL DEFAULT 0,
+          next_run REAL NOT NULL DEFAULT 0,
+          worker TEXT, lease_until REAL,
+          error TEXT, created REAL, finished REAL,
+          UNIQUE(batch, student_id))""",
+     "CREATE INDEX IF NOT EXISTS idx_render_jobs_claim ON render_jobs(status, next_run)"),
+    # 4: change log of ids row ids, so views can refresh just the rows touched since they last looked.
+    # Only the newest ~100k entries are kept; a reader that fell further behind reloads instead.
+    ("""CREATE TABLE IF NOT EXISTS ids_log(
+          seq INTEGER PRIMARY KEY AUTOINCREMENT,
+          row_id INTEGER NOT NULL)""",
+     "CREATE TRIGGER IF NOT EXISTS ids_log_ai AFTER INSERT ON ids BEGIN INSERT INTO ids_log(row_id) VALUES(new.id); END",
+     "CREATE TRIGGER IF NOT EXISTS ids_log_au AFTER UPDATE ON ids BEGIN INSERT INTO ids_log(row_id) VALUES(new.id); END",
+     "CREATE TRIGGER IF NOT EXISTS ids_log_ad AFTER DELETE ON ids BEGIN INSERT INTO ids_log(row_id) VALUES(old.id); END",
+     """CREATE TRIGGER IF NOT EXISTS ids_log_trim AFTER INSERT ON ids_log WHEN new.seq % 1000 = 0 BEGIN
+          DELETE FROM ids_log WHERE seq <= new.seq - 100000; END"""),
+    # 5: one index per sortable column, on the same expression page_records orders by (rowid breaks ties)
+    tuple(f"CREATE INDEX IF NOT EXISTS idx_ids_sort_{c} ON ids(COALESCE({c},''))" for c in SORT_COLUMNS),
+]
+
+def migrate(path=None):
+    db = get_db(path)
+    version = db.query_one("PRAGMA user_version")[0]
+    for i in range(version, len(MIGRATIONS)):
+        with db.transaction() as c:
+            for step in MIGRATIONS[i]:
+                step(c) if callable(step) else c.execute(step)
+            c.execute(f"PRAGMA user_version={i + 1}")
+
+# -------- RECORDS --------
+def add_record(data, pdf_path="", path=None):
+    get_db(path).execute(INSERT_RECORD, tuple(data.get(k) for k in RECORD_FIELDS) + (pdf_path,))
+
+def count_records(path=None):
+    return get_db(path).query_one("SELECT COUNT(*) FROM ids")[0]
+
+def iter_records(student_ids=None, batch=500, path=None):
+    # streams ids rows as dicts with fetchmany, optionally limited to the given student_ids
+    db = get_db(path)
+    cols = ",".join(RECORD_FIELDS)
+    if student_ids is None:
+        for r in db.iter(f"SELECT {cols} FROM ids ORDER BY id", batch=batch):
+            yield dict(zip(RECORD_FIELDS, r))
+        return
+    ids = list(student_ids)
+    for i in range(0, len(ids), batch):
+        chunk = ids[i:i + batch]
+        for r in db.query(f"SELECT {cols} FROM ids WHERE student_id IN ({','.join('?' * len(chunk))}) ORDER BY id", chunk):
+            yield dict(zip(RECORD_FIELDS, r))
+
+def search_records(text, limit=200, path=None):
+    # student_id prefix via the unique index, then name/email/course/department prefix terms via FTS5
+    db = get_db(path)
+    text = text.strip()
+    rows = db.query(f"SELECT {RECORD_COLUMNS} FROM ids WHERE student_id >= ? AND student_id < ? "
+                    "ORDER BY student_id LIMIT ?", (text, text + "\uffff", limit))
+    terms = re.findall(r"\w+", text)
+    if terms and len(rows) < limit:
+        match = " ".join(f'"{t}"*' for t in terms)
+        # rowid order (not rank) lets FTS5 stop after `limit` hits on very common terms
+        rows += db.query(f"SELECT {RECORD_COLUMNS} FROM ids WHERE id IN "
+                         "(SELECT rowid FROM ids_fts WHERE ids_fts MATCH ? LIMIT ?) ORDER BY id", (match, limit))
+    seen, out = set(), []
+    for r in rows:
+        if r[0] not in seen:
+            seen.add(r[0]); out.append(r)
+    return out[:limit]
+
+# -------- CHANGE TRACKING --------
+def data_version(path=None):
+    # moves whenever anyone commits, this thread's connection included; costs no table read
+    c = get_db(path).conn()
+    return c.execute("PRAGMA data_version").fetchone()[0], c.total_changes
+
+def change_seq(path=None):
+    # high-water mark of ids_log: everything up to it is reflected in a query made afterwards
+    return get_db(path).query_one("SELECT COALESCE(MAX(seq),0) FROM ids_log")[0]
+
+def changes_since(seq, limit=1000, path=None):
+    # -> (new high-water mark, {id: current row, or None if deleted}) for ids rows changed after seq,
+    # or None when more than `limit` rows changed or the log no longer reaches back to seq (reload instead)
+    db = get_db(path)
+    log = db.query("SELECT seq,row_id FROM ids_log WHERE seq>? ORDER BY seq LIMIT ?", (seq, limit + 1))
+    if not log:
+        return seq, {}
+    if len(log) > limit or log[0][0] != seq + 1:
+        return None
+    ids = list(dict.fromkeys(r for _, r in log))
+    rows = dict.fromkeys(ids)
+    for i in range(0, len(ids), 900):
+        chunk = ids[i:i + 900]
+        for r in db.query(f"SELECT {RECORD_COLUMNS} FROM ids WHERE id IN ({','.join('?' * len(chunk))})", chunk):
+            rows[r[0]] = r
+    return log[-1][0], rows
+
+def page_records(sort="id", desc=False, after=None, limit=200, path=None):
+    # keyset pagination: `after` is the (sort value, id) of the last row already loaded. Every branch is
+    # an index SEARCH (idx_ids_sort_*), so a page costs the same however deep into the table it is.
+    cols = RECORD_COLUMNS.split(",")
+    if sort not in cols:
+        raise ValueError(f"Unknown sort column: {sort}")
+    key = "id" if sort == "id" else f"COALESCE({sort},'')"
+    op, order = ("<", "DESC") if desc else (">", "ASC")
+    db = get_db(path)
+    if after is None:
+        return db.query(f"SELECT {RECORD_COLUMNS} FROM ids ORDER BY {key} {order}, id {order} LIMIT ?", (limit,))
+    if sort == "id":
+        return db.query(f"SELECT {RECORD_COLUMNS} FROM ids WHERE id {op} ? ORDER BY id {order} LIMIT ?",
+                        (after[1], limit))
+    # rest of the current sort value, then the values after it; SQLite only scans for a (key, id) row value
+    v = "" if after[0] is None else after[0]
+    return db.query(f"""SELECT {RECORD_COLUMNS} FROM (
+          SELECT * FROM (SELECT {RECORD_COLUMNS}, {key} AS k FROM ids WHERE {key} = ? AND id {op} ?
+                         ORDER BY id {order} LIMIT ?)
+          UNION ALL
+          SELECT * FROM (SELECT {RECORD_COLUMNS}, {key} AS k FROM ids WHERE {key} {op} ?
+                         ORDER BY {key} {order}, id {order} LIMIT ?))
+        ORDER BY k {order}, id {order} LIMIT ?""", (v, after[1], limit, v, limit, limit))
@@ -0,0 +1,113 @@
+# streaming export of the ids table to CSV, JSON lines or Parquet: cursor batches, constant memory
+import os, sys, csv, json, time, sqlite3, argparse, itertools
+
+from db import DB_PATH, RECORD_COLUMNS, PRAGMAS, init_db
+
+COLUMNS = RECORD_COLUMNS.split(",")
+FORMATS = ("csv", "jsonl", "parquet")
+BATCH = 5000              # rows per fetchmany / per Parquet row group slice
+ROW_GROUP = 128 * 1024    # rows per Parquet row group
+
+def parse_columns(text):
+    cols = [c.strip() for c in (text or "").split(",") if c.strip()] or COLUMNS
+    bad = [c for c in cols if c not in COLUMNS]
+    if bad:
+        raise ValueError(f"Unknown column(s): {', '.join(bad)} (choose from {RECORD_COLUMNS})")
+    return cols
+
+def format_for(path, fmt=None):
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    fmt = {"json": "jsonl", "ndjson": "jsonl", "pq": "parquet"}.get(fmt, fmt)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt!r} (csv, jsonl or parquet)")
+    return fmt
+
+def iter_batches(columns=None, where=None, params=(), batch=BATCH, path=None):
+    # its own query_only connection: the WHERE text comes from the user and must not be able to write
+    columns = columns or COLUMNS
+    conn = sqlite3.connect(path or DB_PATH)
+    try:
+        for p in PRAGMAS:
+            conn.execute(p)
+        conn.execute("PRAGMA query_only=ON")
+        sql = f"SELECT {','.join(columns)} FROM ids" + (f" WHERE {where}" if where else "") + " ORDER BY id"
+        cur = conn.execute(sql, params)
+        for rows in iter(lambda: cur.fetchmany(batch), []):
+            yield rows
+    finally:
+        conn.close()
+
+# -------- WRITERS --------
+def write_csv(batches, columns, f):
+    w = csv.writer(f)
+    w.writerow(columns)
+    n = 0
+    for rows in batches:
+        w.writerows(rows); n += len(rows)
+    return n
+
+def write_jsonl(batches, columns, f):
+    n = 0
+    for rows in batches:
+        f.write("".join(json.dumps(dict(zip(columns, r)), ensure_ascii=False) + "\n" for r in rows))
+        n += len(rows)
+    return n
+
+def write_parquet(batches, columns, out):
+    # optional dependency: pyarrow; rows are buffered only up to one row group
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    schema = pa.schema([(c, pa.int64() if c == "id" else pa.string()) for c in columns])
+    n, pending, held = 0, [], 0
+    with pq.ParquetWriter(out, schema, compression="zstd") as w:
+        for rows in batches:
+            # each fetch becomes Arrow columns at once: a row group is held as Arrow buffers, not tuples
+            pending.append(pa.table([pa.array(v, t.type) for v, t in zip(zip(*rows), schema)], schema=schema))
+            n += len(rows); held += len(rows)
+            if held >= ROW_GROUP:
+                w.write_table(pa.concat_tables(pending)); pending, held = [], 0
+        if pending:
+            w.write_table(pa.concat_tables(pending))
+    return n
+
+def export(out, fmt=None, columns=None, where=None, params=(), batch=BATCH, path=None):
+    # out is a path or "-" for stdout (csv/jsonl only); returns the number of rows written
+    fmt = format_for(out if out != "-" else "", fmt or ("csv" if out == "-" else None))
+    columns = parse_columns(",".join(columns)) if columns else COLUMNS
+    batches = iter_batches(columns, where, params, batch, path)
+    first = next(batches, [])   # runs the query: a bad filter fails before the output file is created
+    batches = itertools.chain([first] if first else [], batches)
+    if fmt == "parquet":
+        if out == "-":
+            raise ValueError("Parquet can't be written to stdout")
+        return write_parquet(batches, columns, out)
+    writer = write_csv if fmt == "csv" else write_jsonl
+    if out == "-":
+        return writer(batches, columns, sys.stdout)
+    with open(out, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+        return writer(batches, columns, f)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Export the ids table to CSV, JSON lines or Parquet.")
+    ap.add_argument("out", help="output file (format from its extension), or - for stdout")
+    ap.add_argument("-f", "--format", choices=FORMATS, help="override the format implied by the extension")
+    ap.add_argument("-c", "--columns", help=f"comma-separated columns (default: {RECORD_COLUMNS})")
+    ap.add_argument("-w", "--where", help="SQL filter, e.g. \"department='IT' AND year='2'\"")
+    ap.add_argument("--batch", type=int, default=BATCH, help="rows fetched per cursor batch")
+    a = ap.parse_args(argv)
+
+    init_db()
+    start = time.time()
+    try:
+        n = export(a.out, a.format, parse_columns(a.columns), a.where, batch=a.batch)
+    except (ValueError, RuntimeError, sqlite3.Error) as e:
+        print(f"Export failed: {e}", file=sys.stderr)
+        return 1
+    print(f"{n} rows exported in {time.time() - start:.1f}s", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# bulk roster import into the ids table: streamed reads, chunked executemany in explicit transactions
+import sys, csv, time, argparse
+
+from db import RECORD_FIELDS, get_db, init_db
+from roster import parse_mapping, read_roster, validate_email
+
+CHUNK = 5000
+# like db.INSERT_RECORD, but columns missing from the roster (NULL here) keep their stored value
+IMPORT_RECORD = """INSERT INTO ids(name,student_id,course,year,department,phone,email,pdf_path)
+                   VALUES(?,?,?,?,?,?,?,'')
+                   ON CONFLICT(student_id) DO UPDATE SET
+                     name=excluded.name, course=COALESCE(excluded.course, ids.course),
+                     year=COALESCE(excluded.year, ids.year),
+                     department=COALESCE(excluded.department, ids.department),
+                     phone=COALESCE(excluded.phone, ids.phone), email=COALESCE(excluded.email, ids.email)"""
+def clean_row(rec):
+    out = {}
+    for k, v in rec.items():
+        v = "" if v is None else str(v).strip()
+        if k in RECORD_FIELDS and v:   # empty cells are treated as absent, not as blanking the field
+            out[k] = v
+    return out
+
+def check_row(rec):
+    # returns an error message, or None when the row can be stored
+    if not rec.get("name") or not rec.get("student_id"):
+        return "name and student_id are required"
+    if rec.get("email") and not validate_email(rec["email"]):
+        return f"invalid email {rec['email']!r}"
+    return None
+
+def _flush(db, batch, update, counts):
+    # one transaction per chunk: look up which student_ids already exist, then executemany
+    with db.transaction() as c:
+        sids = list(batch)
+        existing = set()
+        for i in range(0, len(sids), 900):
+            part = sids[i:i + 900]
+            existing.update(r[0] for r in c.execute(
+                f"SELECT student_id FROM ids WHERE student_id IN ({','.join('?' * len(part))})", part))
+        rows = []
+        for sid, rec in batch.items():
+            if sid in existing:
+                if not update:
+                    counts["skipped"] += 1; continue
+                counts["updated"] += 1
+            else:
+                counts["inserted"] += 1
+            rows.append(tuple(rec.get(k) for k in RECORD_FIELDS))
+        c.executemany(IMPORT_RECORD, rows)
+
+def import_roster(source, mapping=None, update=True, chunk=CHUNK, path=None, rejects=None):
+    # rejects, if given, is a list that collects (row number, student_id, reason)
+    db = get_db(path)
+    counts = {"inserted": 0, "updated": 0, "skipped": 0, "rejected": 0}
+    batch = {}   # student_id -> record, flushed every `chunk` students
+    for n, row in enumerate(read_roster(source, mapping), 1):
+        rec = clean_row(row)
+        err = check_row(rec)
+        if err:
+            counts["rejected"] += 1
+            if rejects is not None:
+                rejects.append((n, rec.get("student_id", ""), err))
+            continue
+        sid = rec["student_id"]
+        if sid in batch:
+            # repeated within the file: a later row updates the pending one, unless updates are off
+            if not update:
+                counts["skipped"] += 1; continue
+            counts["updated"] += 1
+        batch[sid] = rec
+        if len(batch) >= chunk:
+            _flush(db, batch, update, counts); batch = {}
+    if batch:
+        _flush(db, batch, update, counts)
+    return counts
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Import a CSV/XLSX/JSON roster into the ids table.")
+    ap.add_argument("roster")
+    ap.add_argument("-m", "--map", help='column mapping, e.g. "Roll No=student_id,Full Name=name"')
+    ap.add_argument("--skip-existing", action="store_true", help="leave existing student_ids untouched instead of updating them")
+    ap.add_argument("--chunk", type=int, default=CHUNK, help="rows per transaction")
+    ap.add_argument("--rejects", help="write rejected rows to this CSV")
+    a = ap.parse_args(argv)
+
+    init_db()
+    rejects = []
+    start = time.time()
+    counts = import_roster(a.roster, parse_mapping(a.map), not a.skip_existing, a.chunk, rejects=rejects)
+    for n, sid, err in rejects[:20]:
+        print(f"row {n} ({sid or '?'}): {err}", file=sys.stderr)
+    if len(rejects) > 20:
+        print(f"... and {len(rejects) - 20} more rejected rows", file=sys.stderr)
+    if a.rejects and rejects:
+        with open(a.rejects, "w", newline="") as f:
+            w = csv.writer(f); w.writerow(["row", "student_id", "error"]); w.writerows(rejects)
+    print("{inserted} inserted, {updated} updated, {skipped} skipped, {rejected} rejected".format(**counts),
+          f"in {time.time() - start:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
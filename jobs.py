@@ -0,0 +1,240 @@
+# persistent render queue: render_jobs rows are claimed atomically, retried with backoff, and survive restarts
+import os, sys, time, queue, random, shutil, socket, argparse, multiprocessing
+
+from db import RECORD_FIELDS, get_db, init_db, iter_records
+from card_core import CARD_CACHE, _generate_id, write_pdf
+from pdf_vector import BACKEND, card_link, write_vector_pdf
+from metrics import drain, merge
+
+# -------- CONFIG --------
+LEASE = 300          # seconds a claimed job may run before another worker may take it over
+MAX_ATTEMPTS = 5
+BACKOFF = 30         # seconds before the first retry, doubled for each further attempt
+POLL = 1.0           # idle workers re-check the queue this often
+
+class UploadFailed(Exception):
+    pass   # rate limited or offline: retried after a backoff
+
+class MissingRecord(Exception):
+    pass   # the student was deleted after queueing: failed at once, no retries
+
+# -------- QUEUE --------
+def enqueue(student_ids=None, batch=None, out_dir="generated_cards", fmt="pdf", bg=None, logo=None,
+            upload=False, path=None):
+    # one pending job per student (all of ids when student_ids is None); re-enqueueing a batch adds only
+    # the students it doesn't have yet. Returns (batch, jobs added).
+    batch = batch or time.strftime("batch-%Y%m%d-%H%M%S")
+    out_dir = os.path.abspath(out_dir)
+    sql = """INSERT OR IGNORE INTO render_jobs(batch,student_id,format,out_path,bg,logo,upload,created)
+             SELECT ?, student_id, ?, ? || student_id || ?, ?, ?, ?, ? FROM ids WHERE student_id IS NOT NULL"""
+    params = [batch, fmt, out_dir + os.sep, f"_card.{fmt}", bg, logo, int(upload), time.time()]
+    db = get_db(path)
+    with db.transaction() as c:
+        if student_ids is None:
+            n = c.execute(sql, params).rowcount
+        else:
+            ids, n = list(student_ids), 0
+            for i in range(0, len(ids), 900):
+                part = ids[i:i + 900]
+                n += c.execute(sql + f" AND student_id IN ({','.join('?' * len(part))})", params + part).rowcount
+    return batch, n
+
+def claim(worker, n=1, batch=None, path=None):
+    # BEGIN IMMEDIATE holds the write lock, so two workers can never claim the same row.
+    # Expired leases (a worker that crashed or was killed) are claimable again.
+    now = time.time()
+    where = "((status='pending' AND next_run<=?) OR (status='running' AND lease_until<?))"
+    params = [now, now]
+    if batch:
+        where += " AND batch=?"; params.append(batch)
+    with get_db(path).transaction() as c:
+        rows = c.execute(f"SELECT id,batch,student_id,format,out_path,bg,logo,upload,attempts FROM render_jobs "
+                         f"WHERE {where} ORDER BY id LIMIT ?", params + [n]).fetchall()
+        c.executemany("UPDATE render_jobs SET status='running', worker=?, lease_until=?, attempts=attempts+1 "
+                      "WHERE id=?", [(worker, now + LEASE, r[0]) for r in rows])
+    keys = ("id", "batch", "student_id", "format", "out_path", "bg", "logo", "upload", "attempts")
+    return [dict(zip(keys, r), attempts=r[8] + 1, worker=worker) for r in rows]
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rpartition(")")[2].split()[0] != "Z"   # an unreaped zombie is dead too
+    except OSError:
+        return True
+
+def release_dead(path=None):
+    # jobs left running by workers of this host that no longer exist (killed, reboot) go straight back
+    # to pending instead of waiting out their lease. Elsewhere (and on Windows) the lease covers it.
+    if os.name != "posix":
+        return 0
+    db = get_db(path)
+    host = socket.gethostname()
+    dead = [w for (w,) in db.query("SELECT DISTINCT worker FROM render_jobs WHERE status='running'")
+            if w and w.rpartition(":")[0] == host and w.rpartition(":")[2].isdigit()
+            and not _alive(int(w.rpartition(":")[2]))]
+    n = 0
+    for w in dead:
+        n += db.execute("UPDATE render_jobs SET status='pending', lease_until=NULL WHERE status='running' AND worker=?",
+                        (w,)).rowcount
+    return n
+
+# complete() and fail() only touch a job this worker still holds: after a lease takeover the job belongs
+# to the new worker, and the old one must not overwrite its outcome. Both return False when that happened.
+def complete(job, path=None):
+    with get_db(path).transaction() as c:
+        if not c.execute("UPDATE render_jobs SET status='done', error=NULL, lease_until=NULL, finished=? "
+                         "WHERE id=? AND status='running' AND worker=?",
+                         (time.time(), job["id"], job["worker"])).rowcount:
+            return False
+        if job["format"] == "pdf":
+            c.execute("UPDATE ids SET pdf_path=? WHERE student_id=?", (job["out_path"], job["student_id"]))
+    return True
+
+def fail(job, err, retry=True, path=None):
+    # back to pending with exponential backoff, or failed for good once MAX_ATTEMPTS is used up
+    final = not retry or job["attempts"] >= MAX_ATTEMPTS
+    delay = BACKOFF * 2 ** (job["attempts"] - 1) * (1 + random.random() / 2)
+    return get_db(path).execute("UPDATE render_jobs SET status=?, error=?, next_run=?, lease_until=NULL "
+                                "WHERE id=? AND status='running' AND worker=?",
+                                ("failed" if final else "pending", err, time.time() + delay, job["id"],
+                                 job["worker"])).rowcount > 0
+
+def retry_failed(batch=None, path=None):
+    sql = "UPDATE render_jobs SET status='pending', attempts=0, next_run=0, error=NULL WHERE status='failed'"
+    return get_db(path).execute(sql + " AND batch=?" if batch else sql, (batch,) if batch else ()).rowcount
+
+def progress(batch=None, path=None):
+    # per batch: total and per-status counts, oldest batch first
+    sql = ("SELECT batch, COUNT(*), SUM(status='pending'), SUM(status='running'), SUM(status='done'), "
+           "SUM(status='failed'), MIN(created), MAX(finished) FROM render_jobs")
+    rows = get_db(path).query(sql + (" WHERE batch=?" if batch else "") + " GROUP BY batch ORDER BY MIN(id)",
+                              (batch,) if batch else ())
+    keys = ("batch", "total", "pending", "running", "done", "failed", "created", "finished")
+    return [dict(zip(keys, r)) for r in rows]
+
+# -------- WORKER --------
+def _atomic(path, save):
+    # write-then-rename: an interrupted job never leaves a half-written card at out_path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    base, ext = os.path.splitext(path)
+    tmp = f"{base}.{os.getpid()}.tmp{ext}"
+    save(tmp)
+    os.replace(tmp, path)
+
+def render_job(job, path=None):
+    rec = next(iter_records([job["student_id"]], path=path), None)
+    if rec is None:
+        raise MissingRecord(f"student {job['student_id']!r} is no longer in ids")
+    data = {k: rec.get(k) or "" for k in RECORD_FIELDS}
+    args = (data, job["bg"], job["logo"], None, bool(job["upload"]))
+    # one render (and at most one upload) per job: the link comes from the same render as the card
+    if job["format"] == "pdf" and BACKEND == "vector":
+        link = _uploaded(job, card_link(*args))
+        _atomic(job["out_path"], lambda p: write_vector_pdf(data, p, *args[1:], link=link))
+    elif CARD_CACHE is not None:
+        key, link, _ = CARD_CACHE.render(*args)
+        _uploaded(job, link)
+        src = CARD_CACHE.pdf(key) if job["format"] == "pdf" else CARD_CACHE.png(key)
+        _atomic(job["out_path"], lambda p: shutil.copyfile(src, p))
+    else:
+        img, link, _ = _generate_id(*args)
+        _uploaded(job, link)
+        _atomic(job["out_path"], lambda p: write_pdf(img, p) if job["format"] == "pdf" else img.save(p))
+
+def _uploaded(job, link):
+    if job["upload"] and link.startswith("file:"):
+        raise UploadFailed("upload failed")
+    return link
+
+def work(batch=None, path=None, worker=None, stop_when_idle=True, log=None):
+    # claim -> render -> complete/fail until the queue is drained; returns (done, failed) for this worker
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    db = get_db(path)
+    done = failed = 0
+    while True:
+        jobs = claim(worker, 1, batch, path)
+        if not jobs:
+            q = "SELECT MIN(next_run), SUM(status='running') FROM render_jobs WHERE status IN ('pending','running')"
+            wait, running = db.query_one(q + (" AND batch=?" if batch else ""), (batch,) if batch else ())
+            if wait is None and not running and stop_when_idle:
+                return done, failed
+            # backed-off retries, or jobs still held by other workers (whose lease may yet expire)
+            time.sleep(POLL if wait is None else min(max(wait - time.time(), POLL), LEASE))
+            continue
+        job = jobs[0]
+        try:
+            render_job(job, path)
+            done += complete(job, path)
+        except Exception as e:
+            failed += fail(job, f"{type(e).__name__}: {e}", not isinstance(e, MissingRecord), path)
+            if log:
+                log(f"{job['student_id']}: {type(e).__name__}: {e} (attempt {job['attempts']})")
+
+def _work_proc(batch, path, stats):
+    try:
+        work(batch, path, log=lambda m: print(m, file=sys.stderr))
+    finally:
+        stats.put(drain())   # worker processes skip atexit: hand the span stats to run()
+
+def run(workers=1, batch=None, path=None):
+    # several worker processes over the same queue; each claims its own jobs
+    release_dead(path)
+    if workers <= 1:
+        return work(batch, path, log=lambda m: print(m, file=sys.stderr))
+    stats = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_work_proc, args=(batch, path, stats)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    left = len(procs)
+    while left:   # before join(): a child exits only once its queued stats are read
+        try:
+            merge(stats.get(timeout=POLL)); left -= 1
+        except queue.Empty:
+            if not any(p.is_alive() for p in procs):
+                break   # killed workers send nothing
+    for p in procs:
+        p.join()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Persistent, resumable card render queue.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    q = sub.add_parser("enqueue", help="queue cards for students in the ids table")
+    q.add_argument("--ids", help="comma-separated student IDs (default: every student)")
+    q.add_argument("--batch", help="batch name (default: batch-<timestamp>)")
+    q.add_argument("-o", "--out", default="generated_cards", help="output directory")
+    q.add_argument("-f", "--format", choices=("pdf", "png"), default="pdf")
+    q.add_argument("--bg", help="background image"); q.add_argument("--logo", help="logo image")
+    q.add_argument("--upload", action="store_true", help="upload cards to imgbb for the QR link")
+    r = sub.add_parser("run", help="work through the queue; safe to interrupt and start again")
+    r.add_argument("-j", "--workers", type=int, default=1)
+    r.add_argument("--batch")
+    s = sub.add_parser("status", help="progress per batch")
+    s.add_argument("--batch")
+    f = sub.add_parser("retry", help="give failed jobs a fresh set of attempts")
+    f.add_argument("--batch")
+    a = ap.parse_args(argv)
+
+    init_db()
+    if a.cmd == "enqueue":
+        ids = [x.strip() for x in a.ids.split(",") if x.strip()] if a.ids else None
+        batch, n = enqueue(ids, a.batch, a.out, a.format, a.bg and os.path.abspath(a.bg),
+                           a.logo and os.path.abspath(a.logo), a.upload)
+        print(f"{n} jobs queued in {batch}")
+    elif a.cmd == "run":
+        start = time.time()
+        run(a.workers, a.batch)
+        print(f"queue drained in {time.time() - start:.1f}s")
+    elif a.cmd == "retry":
+        print(f"{retry_failed(a.batch)} failed jobs re-queued")
+    for p in progress(a.batch if a.cmd != "enqueue" else None):
+        print("{batch}: {done}/{total} done, {pending} pending, {running} running, {failed} failed".format(**p))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# low-overhead stage timing: spans aggregate into per-stage counters and histograms
+import os, sys, json, time, atexit, threading
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+JSONL_PATH = os.environ.get("EDUID_METRICS_JSONL")   # opt-in: one JSON line per finished span
+PROM_PATH = os.environ.get("EDUID_METRICS_PROM")     # opt-in: Prometheus text file written at exit
+
+_lock = threading.Lock()
+_stats = {}   # stage -> [count, sum, bucket counts...]
+_local = threading.local()
+_jsonl = None
+
+def record(stage, seconds):
+    i = 0
+    while i < len(BUCKETS) and seconds > BUCKETS[i]:
+        i += 1
+    with _lock:
+        st = _stats.get(stage)
+        if st is None:
+            st = _stats[stage] = [0, 0.0] + [0] * (len(BUCKETS) + 1)
+        st[0] += 1; st[1] += seconds; st[2 + i] += 1
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.append((stage, seconds))
+    if JSONL_PATH:
+        _log(stage, seconds)
+
+def _log(stage, seconds):
+    global _jsonl
+    line = json.dumps({"ts": round(time.time(), 6), "stage": stage, "ms": round(seconds * 1000, 3),
+                       "pid": os.getpid(), "thread": threading.current_thread().name})
+    with _lock:
+        if _jsonl is None:
+            _jsonl = open(JSONL_PATH, "a", buffering=1)
+        _jsonl.write(line + "\n")
+
+class span:
+    # with span("render.qr"): ...   -- times the block and records it under that stage
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.t0)
+
+class collect:
+    # with collect() as spans: ...   -- also lists every span finished in this thread, in order
+    def __enter__(self):
+        self.prev = getattr(_local, "trace", None)
+        _local.trace = self.spans = []
+        return self.spans
+
+    def __exit__(self, *exc):
+        _local.trace = self.prev
+
+def snapshot():
+    with _lock:
+        return {k: list(v) for k, v in _stats.items()}
+
+def drain():
+    # this process's stats since the last drain, then cleared: a worker process returns them with its
+    # results so the parent can merge() them (workers never run the atexit exporter)
+    with _lock:
+        out = {k: list(v) for k, v in _stats.items()}
+        _stats.clear()
+    return out
+
+def merge(stats):
+    with _lock:
+        for stage, v in stats.items():
+            st = _stats.get(stage)
+            if st is None:
+                _stats[stage] = list(v)
+            else:
+                for i, n in enumerate(v):
+                    st[i] += n
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+def summary():
+    # stage -> count, total/mean ms
+    return {k: {"count": v[0], "total_ms": round(v[1] * 1000, 3), "mean_ms": round(v[1] / v[0] * 1000, 3)}
+            for k, v in snapshot().items() if v[0]}
+
+# -------- EXPORTERS --------
+def prometheus_text():
+    out = ["# HELP eduid_stage_seconds Time spent per card pipeline stage.",
+           "# TYPE eduid_stage_seconds histogram"]
+    for stage, st in sorted(snapshot().items()):
+        cum = 0
+        for le, n in zip(BUCKETS + (float("inf"),), st[2:]):
+            cum += n
+            out.append(f'eduid_stage_seconds_bucket{{stage="{stage}",le="{"+Inf" if le == float("inf") else le}"}} {cum}')
+        out.append(f'eduid_stage_seconds_sum{{stage="{stage}"}} {st[1]:.6f}')
+        out.append(f'eduid_stage_seconds_count{{stage="{stage}"}} {st[0]}')
+    return "\n".join(out) + "\n"
+
+def write_prometheus(path):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)   # node_exporter textfile collectors must never see a partial file
+
+def format_trace(spans):
+    return "\n".join(f"{stage:<24} {s * 1000:9.1f} ms" for stage, s in spans)
+
+def _at_exit():
+    if PROM_PATH and _stats:
+        try:
+            write_prometheus(PROM_PATH)
+        except OSError as e:
+            print("Metrics export failed:", e, file=sys.stderr)
+    if _jsonl is not None:
+        _jsonl.close()
+
+atexit.register(_at_exit)
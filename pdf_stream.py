@@ -0,0 +1,101 @@
+# streaming multi-page PDF writer: pages are written as they are added, so memory stays flat
+import zlib
+
+MM = 72 / 25.4
+PAPER = {"A4": (595.28, 841.89), "LETTER": (612.0, 792.0)}
+CARD_PT = (54 * MM, 85.6 * MM)   # CR80 card, same aspect ratio as ID_SIZE
+
+class PdfStream:
+    # minimal PDF 1.4 writer; objects go straight to the output and only their offsets are kept
+    def __init__(self, out, compress=6):
+        self._own = isinstance(out, str)
+        self.f = open(out, "wb") if self._own else out
+        self.compress = compress
+        self.pos = 0
+        self.offsets = [0, 0]            # objects 1 (catalog) and 2 (page tree) are written last
+        self.pages = []
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self.f.write(data); self.pos += len(data)
+
+    def _obj(self, body, stream=None, num=None):
+        if num is None:
+            self.offsets.append(0); num = len(self.offsets)
+        self.offsets[num - 1] = self.pos
+        if stream is None:
+            self._write(b"%d 0 obj\n%s\nendobj\n" % (num, body))
+        else:
+            self._write(b"%d 0 obj\n%s\nstream\n" % (num, body))
+            self._write(stream)
+            self._write(b"\nendstream\nendobj\n")
+        return num
+
+    def add_image(self, img):
+        # PIL image -> Flate-compressed RGB XObject; returns its object number
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        data = zlib.compress(img.tobytes(), self.compress)
+        return self._obj(b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB "
+                         b"/BitsPerComponent 8 /Filter /FlateDecode /Length %d >>"
+                         % (img.width, img.height, len(data)), data)
+
+    def add_page(self, pagesize, placements):
+        # placements: [(PIL image, x, y, w, h)] in points, origin bottom-left
+        names, ops = [], []
+        for i, (img, x, y, w, h) in enumerate(placements):
+            names.append(b"/Im%d %d 0 R" % (i, self.add_image(img)))
+            ops.append(b"q %.2f 0 0 %.2f %.2f %.2f cm /Im%d Do Q" % (w, h, x, y, i))
+        content = b"\n".join(ops)
+        contents = self._obj(b"<< /Length %d >>" % len(content), content)
+        self.pages.append(self._obj(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] /Resources << /XObject << %s >> >> "
+            b"/Contents %d 0 R >>" % (pagesize[0], pagesize[1], b" ".join(names), contents)))
+
+    def close(self):
+        kids = b" ".join(b"%d 0 R" % p for p in self.pages)
+        self._obj(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.pages)), num=2)
+        self._obj(b"<< /Type /Catalog /Pages 2 0 R >>", num=1)
+        xref = self.pos
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.offsets) + 1))
+        self._write(b"".join(b"%010d 00000 n \n" % o for o in self.offsets))
+        self._write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(self.offsets) + 1, xref))
+        if self._own:
+            self.f.close()
+        else:
+            self.f.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# -------- N-UP IMPOSITION --------
+def sheet_slots(paper="A4", card=CARD_PT, margin=10 * MM, gap=4 * MM):
+    # card positions on one sheet, filled left-to-right, top-to-bottom
+    pw, ph = PAPER[paper.upper()]
+    cw, ch = card
+    cols = max(1, int((pw - 2 * margin + gap) // (cw + gap)))
+    rows = max(1, int((ph - 2 * margin + gap) // (ch + gap)))
+    x0 = (pw - cols * cw - (cols - 1) * gap) / 2
+    y0 = ph - (ph - rows * ch - (rows - 1) * gap) / 2
+    return [(x0 + c * (cw + gap), y0 - (r + 1) * ch - r * gap, cw, ch)
+            for r in range(rows) for c in range(cols)]
+
+def write_cards(images, out, page_size, paper=None, progress=None):
+    # one card per page_size page, or N-up on A4/Letter sheets when paper is given; returns card count
+    slots = sheet_slots(paper) if paper else [(0, 0, page_size[0], page_size[1])]
+    size = PAPER[paper.upper()] if paper else page_size
+    n, pending = 0, []
+    with PdfStream(out) as pdf:
+        for img in images:
+            pending.append((img,) + slots[len(pending)])
+            n += 1
+            if len(pending) == len(slots):
+                pdf.add_page(size, pending); pending = []
+            if progress:
+                progress(n)
+        if pending or not pdf.pages:
+            pdf.add_page(size, pending)
+    return n
@@ -0,0 +1,200 @@
+# vector PDF backend: the generate_id layout drawn with reportlab primitives (text, QR) instead of one raster.
+# Background and logo live in a per-template form drawn once per file; photos are the only per-card images.
+import io, os
+
+from PIL import Image
+
+from card_core import (ASSET_CACHE, CARD_CACHE, ID_SIZE, INFO_FIELDS, PHOTO_SIZE, PHOTO_XY, QR_QUIET, Y_INFO,
+                       Y_NAME, _file_key, _generate_id, find_font, get_font, local_link, qr_matrix)
+from metrics import span
+from pdf_stream import PAPER, sheet_slots
+
+BACKEND = os.environ.get("EDUID_PDF_BACKEND", "vector")   # "raster" embeds the generate_id PNG instead
+JPEG_QUALITY = 90   # photos (and JPEG backgrounds/logos) are embedded as JPEG at their card size
+QR_SIZE = 180
+FONTS = {"arial.ttf": "Helvetica", "arialbd.ttf": "Helvetica-Bold"}   # fallbacks when the TTF isn't found
+
+def _font(c, name, size):
+    # -> (reportlab font name, ascent in card px), matching PIL's top-left text anchor
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    path = find_font(name)
+    if path is None:
+        return FONTS[name], pdfmetrics.getAscent(FONTS[name], size)
+    if name not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(name, path))   # embedded as a subset, once per process
+    return name, get_font(name, size).getmetrics()[0]
+
+def _reader(path, size, photo=False):
+    # embedded at card size. Photos, and assets that were JPEGs to begin with, go in as JPEG (DCTDecode):
+    # a JPEG no larger than its slot is passed through untouched, anything else is resized through
+    # ASSET_CACHE and re-encoded. Other assets (PNG logos, drawn backgrounds) stay lossless (Flate), and
+    # anything with transparent pixels keeps its alpha as a soft mask (drawImage(mask="auto")).
+    from reportlab.lib.utils import ImageReader
+    with Image.open(path) as src:
+        fmt, src_size = src.format, src.size
+    if fmt == "JPEG" and src_size[0] <= size[0] and src_size[1] <= size[1]:
+        return ImageReader(path)
+    img = ASSET_CACHE.get(path, size)
+    if img.getextrema()[3][0] < 255:
+        return ImageReader(img)
+    img = img.convert("RGB")
+    if not (photo or fmt == "JPEG"):
+        return ImageReader(img)
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=JPEG_QUALITY)
+    buf.seek(0)
+    return ImageReader(buf)
+
+def card_link(data, bg_path=None, logo_path=None, photo_path=None, upload=True, cache=True):
+    # the link generate_id would put in the QR; an upload needs the raster card, taken from the card cache
+    if not upload:
+        return local_link(data)
+    if cache and CARD_CACHE is not None:
+        return CARD_CACHE.render(data, bg_path, logo_path, photo_path, upload)[1]
+    return _generate_id(data, bg_path, logo_path, photo_path, upload)[1]
+
+class VectorCards:
+    # canvas wrapper placing cards one per page or N-up; add() resolves everything that can fail
+    # (photo, link, QR) before it draws, so a bad record never leaves a half-drawn card behind
+    def __init__(self, out, paper=None):
+        from reportlab.pdfgen import canvas   # lazy: reportlab is only loaded for PDF output
+        self.slots = sheet_slots(paper) if paper else [(0, 0, ID_SIZE[0], ID_SIZE[1])]
+        self.c = canvas.Canvas(out, pagesize=PAPER[paper.upper()] if paper else ID_SIZE)
+        self.count = self._on_page = 0
+        self._forms = {}   # (bg, logo) file keys -> form name
+
+    def add(self, data, bg_path=None, logo_path=None, photo_path=None, upload=True, link=None):
+        with span("pdf.vector_card"):
+            photo = None
+            if photo_path and os.path.exists(photo_path):
+                photo = _reader(photo_path, PHOTO_SIZE, photo=True)
+            link = link or card_link(data, bg_path, logo_path, photo_path, upload)
+            matrix = qr_matrix(link, QR_SIZE)
+
+            if self._on_page == len(self.slots):
+                self.c.showPage(); self._on_page = 0
+            x, y, w, h = self.slots[self._on_page]
+            c = self.c
+            c.saveState()
+            c.translate(x, y); c.scale(w / ID_SIZE[0], h / ID_SIZE[1])
+            c.doForm(self._template(bg_path, logo_path))
+            if photo is not None:
+                self._ellipse_image(photo, PHOTO_XY, PHOTO_SIZE)
+            self._text(data)
+            self._qr(matrix)
+            c.restoreState()
+            self._on_page += 1; self.count += 1
+
+    @property
+    def page_full(self):
+        # True between cards that end a page: the only place a caller may switch files
+        return self._on_page in (0, len(self.slots))
+
+    def _template(self, bg_path, logo_path):
+        # background, header, logo and labels as one form XObject, stored once per file
+        key = (_file_key(bg_path), _file_key(logo_path))
+        name = self._forms.get(key)
+        if name is None:
+            name = self._forms[key] = f"card_template_{len(self._forms)}"
+            W, H = ID_SIZE
+            c = self.c
+            c.beginForm(name, 0, 0, W, H)
+            if bg_path and os.path.exists(bg_path):
+                c.drawImage(_reader(bg_path, ID_SIZE), 0, 0, W, H, mask="auto")
+            else:
+                c.setFillColorRGB(1, 1, 1); c.rect(0, 0, W, H, stroke=0, fill=1)
+            c.setFillColorRGB(0, 0, 0)
+            font, ascent = _font(c, "arialbd.ttf", 48)
+            c.setFont(font, 48)
+            c.drawCentredString(W / 2, H - 40 - ascent, "STUDENT")
+            if logo_path and os.path.exists(logo_path):
+                self._ellipse_image(_reader(logo_path, (120, 120)), (25, 25), (120, 120))
+            font, ascent = _font(c, "arial.ttf", 26)
+            c.setFont(font, 26)
+            for i, (label, _) in enumerate(INFO_FIELDS):
+                c.drawString(50, H - Y_INFO - 45 * i - ascent, f"{label}: ")
+            c.endForm()
+        return name
+
+    def _ellipse_image(self, img, xy, size):
+        # the image clipped to an ellipse: vector edges instead of a rounded alpha mask
+        c = self.c
+        x, y = xy[0], ID_SIZE[1] - xy[1] - size[1]
+        c.saveState()
+        p = c.beginPath(); p.ellipse(x, y, size[0], size[1])
+        c.clipPath(p, stroke=0, fill=0)
+        c.drawImage(img, x, y, size[0], size[1], mask="auto")
+        c.restoreState()
+
+    def _text(self, data):
+        W, H = ID_SIZE
+        c = self.c
+        c.setFillColorRGB(0, 0, 0)
+        font, ascent = _font(c, "arialbd.ttf", 40)
+        c.setFont(font, 40)
+        c.drawCentredString(W / 2, H - Y_NAME - ascent, data.get("name", ""))
+        font, ascent = _font(c, "arial.ttf", 26)
+        c.setFont(font, 26)
+        for i, (label, key) in enumerate(INFO_FIELDS):
+            x = 50 + c.stringWidth(f"{label}: ", font, 26)
+            c.drawString(x, H - Y_INFO - 45 * i - ascent, data.get(key) or "")
+
+    def _qr(self, matrix):
+        # same module grid as make_qr, as filled rectangles (one per run of dark modules) in a single path
+        n = len(matrix)
+        box = max(QR_SIZE // (n + 2 * QR_QUIET), 1)
+        x0, top = ID_SIZE[0] - QR_SIZE - 40, ID_SIZE[1] - (Y_NAME + 110)
+        c = self.c
+        c.setFillColorRGB(1, 1, 1); c.rect(x0, top - QR_SIZE, QR_SIZE, QR_SIZE, stroke=0, fill=1)
+        off = (QR_SIZE - n * box) / 2
+        p = c.beginPath()
+        for r, row in enumerate(matrix):
+            y = top - off - (r + 1) * box
+            col = 0
+            while col < n:
+                if row[col]:
+                    start = col
+                    while col < n and row[col]:
+                        col += 1
+                    p.rect(x0 + off + start * box, y, (col - start) * box, box)
+                else:
+                    col += 1
+        c.setFillColorRGB(0, 0, 0)
+        c.drawPath(p, stroke=0, fill=1)
+
+    def close(self):
+        with span("pdf.save"):
+            self.c.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write_vector_pdf(data, out, bg_path=None, logo_path=None, photo_path=None, upload=True, link=None):
+    # one card, one page: the vector counterpart of generate_id + write_pdf
+    with VectorCards(out) as pdf:
+        pdf.add(data, bg_path, logo_path, photo_path, upload, link)
+
+def part_path(pdf_path, part):
+    base, ext = os.path.splitext(pdf_path)
+    return pdf_path if part == 1 else f"{base}-{part:03d}{ext}"
+
+def write_vector_cards(jobs, out, paper=None, progress=None, split=None):
+    # jobs: (data, bg, logo, photo, upload) tuples, streamed; returns (card count, files written).
+    # reportlab holds a file in memory until it is saved, so with split (out a path) output rolls over to
+    # <name>-002.pdf, <name>-003.pdf, ... every `split` cards, at a page break.
+    pdf, part, done = VectorCards(out, paper), 1, 0
+    try:
+        for job in jobs:
+            if split and pdf.count >= split and pdf.page_full:
+                done += pdf.count; pdf.close(); part += 1
+                pdf = VectorCards(part_path(out, part), paper)
+            pdf.add(*job)
+            if progress:
+                progress(done + pdf.count)
+    finally:
+        pdf.close()
+    return done + pdf.count, part
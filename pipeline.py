@@ -0,0 +1,57 @@
+# bounded streaming for batch runs: at most N tasks between the roster cursor and the writer, memory ceiling
+import os, sys, threading, multiprocessing
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def rss_mb(pid=None):
+    # current resident set of one process, from /proc on Linux; elsewhere this process's peak
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        if resource is None or pid:
+            return 0.0
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+def tree_rss_mb():
+    # this process plus its worker processes
+    return rss_mb() + sum(rss_mb(p.pid) for p in multiprocessing.active_children())
+
+class Window:
+    # Pool.imap* pulls its input as fast as it can and queues every result it hasn't handed back yet,
+    # so a fast roster or a slow writer grows memory with the batch size. feed() wraps the input and
+    # blocks once `size` tasks are in flight (or the process tree is over max_mb) until done() says
+    # the consumer has released one.
+    def __init__(self, size, max_mb=None):
+        self.size, self.max_mb = max(1, size), max_mb
+        self.in_flight = 0
+        self.peak_mb = 0.0
+        self._cond = threading.Condition()
+
+    def feed(self, iterable):
+        for item in iterable:
+            with self._cond:
+                while self.in_flight >= self.size or (self.in_flight and self.over()):
+                    self._cond.wait(0.5)
+                self.in_flight += 1
+            yield item
+
+    def over(self):
+        # True when the process tree is above max_mb; also samples the peak
+        mb = tree_rss_mb()
+        self.peak_mb = max(self.peak_mb, mb)
+        if not self.max_mb:
+            return False
+        return mb > self.max_mb
+
+    def done(self, n=1):
+        with self._cond:
+            self.in_flight -= n
+            self.peak_mb = max(self.peak_mb, tree_rss_mb())
+            self._cond.notify_all()
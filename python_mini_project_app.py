@@ -1,145 +1,207 @@
 # code of python mini project: student id card generator with qr
-import os, sys, sqlite3, tempfile, hashlib, re, requests, base64
+import os, sys, sqlite3, hashlib
 from PySide6 import QtCore, QtGui, QtWidgets
-from PIL import Image, ImageDraw, ImageFont
-import qrcode
-from reportlab.pdfgen import canvas
+from PIL import Image
+# rendering, database and upload code is Qt-free (card_core, db, uploader); the names below
+# are also re-exported from here for scripts that used to import them from this file
+from card_core import (ID_SIZE, make_rounded, make_qr, upload_to_imgbb, generate_id, render_preview, write_pdf,
+                       pdf_bytes)
+from pdf_stream import write_cards
+from pdf_vector import BACKEND as PDF_BACKEND, write_vector_pdf, write_vector_cards, part_path
+from roster import validate_email
+from importer import import_roster
+from export import export as export_records
+from jobs import enqueue, retry_failed, progress as job_progress
+from metrics import span, collect, format_trace
+from db import (DB_PATH, RECORD_COLUMNS, get_db, init_db, add_record, count_records, iter_records, search_records,
+                page_records, data_version, change_seq, changes_since)
 
 # -------- CONFIG --------
-DB_PATH = "eduid_maker.db"
 APP_TITLE = "Welcome to EduID Maker!"
 ACCENT_COLOR = "#2f9e44"
 DASHBOARD_BG = "#d7f9b1"
 LOGIN_BG = "#1c1c1c"
-ID_SIZE = (630, 1000)
+BULK_PDF_SPLIT = 1000   # vector bulk exports start <name>-002.pdf, ... every N cards to bound memory
 
 # -------- DATABASE --------
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("""CREATE TABLE IF NOT EXISTS users(
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE,
-        email TEXT,
-        password TEXT)""")
-    cur.execute("""CREATE TABLE IF NOT EXISTS ids(
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT,
-        student_id TEXT,
-        course TEXT,
-        year TEXT,
-        department TEXT,
-        phone TEXT,
-        email TEXT,
-        pdf_path TEXT)""")
-    conn.commit()
-    conn.close()
-
+# connection reuse, WAL and batch helpers live in db.py, shared with the CLI and workers
 def hash_password(p):
     return hashlib.sha256(p.encode()).hexdigest()
 
-def validate_email(e):
-    return bool(re.match(r"[^@]+@[^@]+\.[^@]+", e))
-
-# -------- IMAGE UTILS --------
-def make_rounded(img: Image.Image, size):
-    img = img.convert("RGBA").resize(size, Image.Resampling.LANCZOS)
-    mask = Image.new("L", size, 0)
-    d = ImageDraw.Draw(mask)
-    d.ellipse((0, 0, size[0], size[1]), fill=255)
-    img.putalpha(mask)
-    return img
-
-def make_qr(text, size=150):
-    qr = qrcode.make(text).convert("RGBA").resize((size, size))
-    return qr
-
-# -------- UPLOAD TO IMGBB --------
-def upload_to_imgbb(local_path):
-    api_key = "f59c4fbcf150b55e7f0d732d71d97a38"  # Replace with your actual key
-    try:
-        with open(local_path, "rb") as f:
-            img_b64 = base64.b64encode(f.read())
-        resp = requests.post(
-            "https://api.imgbb.com/1/upload",
-            data={"key": api_key, "image": img_b64}
-        )
-        if resp.status_code == 200:
-            j = resp.json()
-            return j["data"]["url"]
+# -------- BACKGROUND RENDERING --------
+def pil_to_qimage(img):
+    # wraps the raw pixel buffer directly, no PNG encode or temp file
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+    fmt, bpp = (QtGui.QImage.Format_RGB888, 3) if img.mode == "RGB" else (QtGui.QImage.Format_RGBA8888, 4)
+    data = img.tobytes()
+    return QtGui.QImage(data, img.width, img.height, img.width * bpp, fmt).copy()  # detach from data
+
+class RenderSignals(QtCore.QObject):
+    done = QtCore.Signal(int, object)    # job id, QImage
+    failed = QtCore.Signal(int, str)
+    profiled = QtCore.Signal(int, object)   # job id, [(stage, seconds)]
+
+class RenderJob(QtCore.QRunnable):
+    # renders one card on a QThreadPool thread; jobs superseded before they start are skipped
+    def __init__(self, job_id, is_current, signals, data, bg, logo, photo, upload, size=None, profile=False):
+        super().__init__()
+        self.job_id, self.is_current, self.signals = job_id, is_current, signals
+        self.args = (data, bg, logo, photo, upload)
+        self.size, self.profile = size, profile
+
+    def run(self):
+        if not self.is_current(self.job_id):
+            return
+        try:
+            with collect() as spans:
+                if self.args[4]:
+                    # explicit (uploading) renders make the full card for the upload and the card cache
+                    img = generate_id(*self.args)
+                    if self.size:
+                        with span("preview.scale"):
+                            img.thumbnail(self.size, Image.Resampling.LANCZOS)
+                else:
+                    # live previews are drawn at the label's size and never saved
+                    img = render_preview(*self.args[:4], self.size or ID_SIZE)
+                with span("preview.qimage"):
+                    qimg = pil_to_qimage(img)
+        except Exception as e:
+            self.signals.failed.emit(self.job_id, str(e))
         else:
-            print("Upload failed:", resp.text)
-            return None
-    except Exception as e:
-        print("Upload error:", e)
+            self.signals.done.emit(self.job_id, qimg)
+            if self.profile:
+                self.signals.profiled.emit(self.job_id, spans)
+
+# -------- RECORDS MODEL --------
+class RecordsModel(QtCore.QAbstractTableModel):
+    # ids rows loaded a page at a time as the view scrolls; sorting is done by SQL.
+    # refresh() applies only the rows changed since the last look (ids_log), and nothing at all
+    # when the database hasn't changed.
+    HEADERS = ["ID","Name","Student ID","Course","Year","Dept","Phone","Email","PDF Path"]
+    COLUMNS = RECORD_COLUMNS.split(",")
+    PAGE = 200
+    MAX_CHANGES = 1000   # beyond this many changed rows a reload is cheaper
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []; self.more = False; self.paged = True
+        self.sort_col, self.desc = 0, False
+        self.by_id = {}; self.version = None; self.seq = 0
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and index.isValid():
+            val = self.rows[index.row()][index.column()]
+            return "" if val is None else str(val)
         return None
 
-# -------- ID GENERATION --------
-def generate_id(data, bg_path=None, logo_path=None, photo_path=None):
-    W, H = ID_SIZE
-    if bg_path and os.path.exists(bg_path):
-        bg = Image.open(bg_path).convert("RGBA").resize((W, H))
-    else:
-        bg = Image.new("RGBA", (W, H), "white")
-
-    d = ImageDraw.Draw(bg)
-    try:
-        f_title = ImageFont.truetype("arialbd.ttf", 48)
-        f_name = ImageFont.truetype("arialbd.ttf", 40)
-        f_info = ImageFont.truetype("arial.ttf", 26)
-    except:
-        f_title = f_name = f_info = ImageFont.load_default()
-
-    # Header
-    text = "STUDENT"
-    w_text = d.textlength(text, font=f_title)
-    d.text(((W - w_text)//2, 40), text, font=f_title, fill="black")
-
-    # Logo
-    if logo_path and os.path.exists(logo_path):
-        logo = make_rounded(Image.open(logo_path), (120, 120))
-        bg.paste(logo, (25, 25), logo)
-
-    # Photo
-    y_photo = 150
-    if photo_path and os.path.exists(photo_path):
-        photo = make_rounded(Image.open(photo_path), (250, 300))
-        bg.paste(photo, ((W - 250)//2, y_photo), photo)
-
-    # Student Name
-    y_name = y_photo + 320
-    name = data.get("name", "")
-    w_name = d.textlength(name, font=f_name)
-    d.text(((W - w_name)//2, y_name), name, font=f_name, fill="black")
-
-    # Info block 
-    y_info = y_name + 90
-    for label, val in [
-        ("ID", data.get("student_id")),
-        ("Course", data.get("course")),
-        ("Year", data.get("year")),
-        ("Department", data.get("department")),
-        ("Phone", data.get("phone")),
-        ("Email", data.get("email")),
-    ]:
-        d.text((50, y_info), f"{label}: {val or ''}", font=f_info, fill="black")
-        y_info += 45
-
-    # Save temporary ID image locally
-    os.makedirs("generated_cards", exist_ok=True)
-    local_name = f"{data.get('student_id','temp')}_card.png"
-    local_path = os.path.abspath(os.path.join("generated_cards", local_name))
-    bg.save(local_path)
-
-    # Upload to imgbb
-    link = upload_to_imgbb(local_path)
-    if not link:
-        link = f"file:///{local_path.replace(os.sep, '/')}"
-
-    qr = make_qr(link, size=180)
-    bg.paste(qr, (W - qr.width - 40, y_name + 110), qr)
-
-    return bg.convert("RGB")
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and self.more
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid() or not self.more: return
+        last = self.rows[-1] if self.rows else None
+        after = (last[self.sort_col], last[0]) if last else None
+        page = page_records(self.COLUMNS[self.sort_col], self.desc, after, self.PAGE)
+        self.more = len(page) == self.PAGE
+        if page:
+            self.beginInsertRows(QtCore.QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+            self.rows.extend(page)
+            self.by_id.update((r[0], r) for r in page)
+            self.endInsertRows()
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        self.sort_col, self.desc = column, order == QtCore.Qt.DescendingOrder
+        if self.paged:
+            self.reload()
+        else:
+            self.beginResetModel()
+            self.rows.sort(key=lambda r: (r[column] is not None, r[column] or ""), reverse=self.desc)
+            self.endResetModel()
+
+    def reload(self):
+        # back to keyset-paged browsing of the whole table
+        self.version, self.seq = data_version(), change_seq()
+        self.beginResetModel()
+        self.rows, self.more, self.paged, self.by_id = [], True, True, {}
+        self.endResetModel()
+        self.fetchMore()
+
+    def refresh(self):
+        # incremental reload of the paged view; a search result is replaced by the paged view
+        if not self.paged or self.version is None:
+            return self.reload()
+        version = data_version()
+        if version == self.version:
+            return
+        changes = changes_since(self.seq, self.MAX_CHANGES)
+        if changes is None:
+            return self.reload()
+        self.version, (self.seq, rows) = version, changes
+        for rid, row in rows.items():
+            self._apply(rid, row)
+
+    def _key(self, row):
+        # the order page_records returns rows in: (COALESCE(col,''), id), or just id
+        if self.sort_col == 0:
+            return (row[0],)
+        v = row[self.sort_col]
+        return ("" if v is None else str(v), row[0])
+
+    def _bisect(self, key):
+        # position of `key` among the loaded rows in the current sort order
+        lo, hi = 0, len(self.rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            k = self._key(self.rows[mid])
+            if (k > key) if self.desc else (k < key):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _apply(self, rid, row):
+        # one changed row: updated in place, moved, removed, or inserted where the sort puts it
+        old = self.by_id.pop(rid, None)
+        if old is not None:
+            i = self._bisect(self._key(old))
+            if i >= len(self.rows) or self.rows[i][0] != rid:
+                i = next(n for n, r in enumerate(self.rows) if r[0] == rid)
+            if row is not None and self._key(row) == self._key(old):
+                self.rows[i] = self.by_id[rid] = row
+                self.dataChanged.emit(self.index(i, 0), self.index(i, len(self.HEADERS) - 1))
+                return
+            self.beginRemoveRows(QtCore.QModelIndex(), i, i)
+            del self.rows[i]
+            self.endRemoveRows()
+        if row is None:
+            return
+        i = self._bisect(self._key(row))
+        if i == len(self.rows) and self.more:
+            return   # past the loaded pages: fetchMore brings it in, in order
+        self.beginInsertRows(QtCore.QModelIndex(), i, i)
+        self.rows.insert(i, row); self.by_id[rid] = row
+        self.endInsertRows()
+
+    def set_rows(self, rows):
+        # a fixed result set, e.g. a search
+        self.beginResetModel()
+        self.rows, self.more, self.paged, self.by_id = list(rows), False, False, {}
+        self.endResetModel()
+
+    def student_id(self, row):
+        return self.rows[row][2]
 
 # -------- LOGIN & SIGNUP --------
 class Login(QtWidgets.QWidget):
@@ -182,9 +244,7 @@ class Login(QtWidgets.QWidget):
 
     def login(self):
         u, p = self.user.text().strip(), self.passw.text().strip()
-        conn = sqlite3.connect(DB_PATH); cur = conn.cursor()
-        cur.execute("SELECT password FROM users WHERE username=?", (u,))
-        row = cur.fetchone(); conn.close()
+        row = get_db().query_one("SELECT password FROM users WHERE username=?", (u,))
         if row and row[0] == hash_password(p):
             self.dash = Dashboard(); self.dash.show(); self.close()
         else:
@@ -231,14 +291,12 @@ class Signup(QtWidgets.QWidget):
         if not validate_email(e):
             QtWidgets.QMessageBox.warning(self, "Error", "Invalid email")
             return
-        conn = sqlite3.connect(DB_PATH); cur = conn.cursor()
         try:
-            cur.execute("INSERT INTO users(username,email,password) VALUES(?,?,?)", (u,e,hash_password(p)))
-            conn.commit(); QtWidgets.QMessageBox.information(self, "Success", "Account Created!")
+            get_db().execute("INSERT INTO users(username,email,password) VALUES(?,?,?)", (u,e,hash_password(p)))
+            QtWidgets.QMessageBox.information(self, "Success", "Account Created!")
             self.l = Login(); self.l.show(); self.close()
         except sqlite3.IntegrityError:
             QtWidgets.QMessageBox.warning(self, "Error", "Username already exists")
-        conn.close()
 
 # -------- DASHBOARD --------
 class Dashboard(QtWidgets.QWidget):
@@ -247,6 +305,15 @@ class Dashboard(QtWidgets.QWidget):
         self.setWindowTitle(APP_TITLE)
         self.setWindowState(QtCore.Qt.WindowMaximized)
         self.bg = self.logo = self.photo = None
+        self.render_pool = QtCore.QThreadPool(self); self.render_pool.setMaxThreadCount(2)
+        self.render_signals = RenderSignals(self)
+        self.render_signals.done.connect(self.show_preview)
+        self.render_signals.failed.connect(self.preview_failed)
+        self.render_signals.profiled.connect(lambda job_id, spans: job_id == self.job_id and self.show_profile(spans))
+        self.job_id = 0
+        self.preview_timer = QtCore.QTimer(self); self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(300)
+        self.preview_timer.timeout.connect(lambda: self.start_preview(upload=False))
         self.init_ui()
 
     def init_ui(self):
@@ -261,6 +328,7 @@ class Dashboard(QtWidgets.QWidget):
         for text, fn in [
             ("Generate ID", lambda: self.stack.setCurrentIndex(0)),
             ("View Records", lambda: (self.stack.setCurrentIndex(1), self.load_records())),
+            ("Render Jobs", lambda: (self.stack.setCurrentIndex(2), self.load_jobs())),
             ("Logout", self.logout)
         ]:
             b = QtWidgets.QPushButton(text)
@@ -275,8 +343,10 @@ class Dashboard(QtWidgets.QWidget):
         h.addWidget(self.stack, 1)
         self.page_gen = self.make_generate_page()
         self.page_rec = self.make_records_page()
+        self.page_jobs = self.make_jobs_page()
         self.stack.addWidget(self.page_gen)
         self.stack.addWidget(self.page_rec)
+        self.stack.addWidget(self.page_jobs)
 
     # ----------------------- Generate Page -----------------------
     def make_generate_page(self):
@@ -297,6 +367,9 @@ class Dashboard(QtWidgets.QWidget):
         self.dept.setFixedHeight(48); self.dept.setFixedWidth(400)
         self.dept.setStyleSheet("font-size:18px; margin:6px;")
         for w in (self.name,self.sid,self.course,self.year,self.dept,self.phone,self.email): l.addWidget(w)
+        for w in (self.name,self.sid,self.course,self.year,self.phone,self.email):
+            w.textChanged.connect(self.schedule_preview)
+        self.dept.currentIndexChanged.connect(self.schedule_preview)
 
         for txt, attr in [("Load Photo","photo"),("Load Logo","logo"),("Load Background","bg")]:
             b = QtWidgets.QPushButton(txt)
@@ -311,6 +384,10 @@ class Dashboard(QtWidgets.QWidget):
             b.setFixedHeight(46)
             b.setStyleSheet(f"background-color:{ACCENT_COLOR}; color:white; font-size:17px; border-radius:6px; margin:4px;")
             b.clicked.connect(fn); fl.addWidget(b)
+        self.profile_chk = QtWidgets.QCheckBox("Profile this render")
+        self.profile_chk.setToolTip("Show a per-stage timing breakdown after Generate Preview / Save as PDF")
+        self.profile_chk.setStyleSheet("font-size:15px; margin:6px;")
+        fl.addWidget(self.profile_chk)
         l.addWidget(f)
         layout.addWidget(left)
 
@@ -328,6 +405,7 @@ class Dashboard(QtWidgets.QWidget):
         if path:
             setattr(self, kind, path)
             QtWidgets.QMessageBox.information(self, "Loaded", f"{kind.capitalize()} loaded successfully!")
+            self.schedule_preview()
 
     def collect(self):
         return {
@@ -345,29 +423,53 @@ class Dashboard(QtWidgets.QWidget):
         if not data["name"] or not data["student_id"]:
             QtWidgets.QMessageBox.warning(self, "Error", "Name and Student ID required!")
             return
-        img = generate_id(data, self.bg, self.logo, self.photo)
-        tmp = os.path.join(tempfile.gettempdir(), "preview_card.png")
-        img.save(tmp)
-        pix = QtGui.QPixmap(tmp)
-        self.preview.setPixmap(pix.scaled(self.preview.size(), QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation))
+        self.start_preview(upload=True)
+
+    def schedule_preview(self):
+        # live preview: restart the debounce timer so only the latest form state is rendered
+        self.preview_timer.start()
+
+    def start_preview(self, upload):
+        data = self.collect()
+        if not data["name"] or not data["student_id"]:
+            return
+        self.preview_timer.stop()
+        self.job_id += 1
+        self.render_pool.clear()    # drop queued, not yet started, stale jobs
+        self.render_pool.start(RenderJob(self.job_id, lambda j: j == self.job_id, self.render_signals,
+                                         data, self.bg, self.logo, self.photo, upload,
+                                         (self.preview.width(), self.preview.height()),
+                                         upload and self.profile_chk.isChecked()))
+
+    def show_preview(self, job_id, qimg):
+        if job_id != self.job_id:
+            return
+        self.preview.setPixmap(QtGui.QPixmap.fromImage(qimg))
+
+    def show_profile(self, spans):
+        if self.profile_chk.isChecked() and spans:
+            box = QtWidgets.QMessageBox(self); box.setWindowTitle("Render profile")
+            box.setText(format_trace(spans))
+            box.setStyleSheet("QLabel{font-family:monospace;}")
+            box.show()
+
+    def preview_failed(self, job_id, msg):
+        if job_id == self.job_id:
+            QtWidgets.QMessageBox.warning(self, "Error", f"Preview failed: {msg}")
 
     def save_record(self):
         data = self.collect()
         if not data["name"] or not data["student_id"]:
             QtWidgets.QMessageBox.warning(self, "Error", "Enter Name and Student ID first!")
             return
-        conn = sqlite3.connect(DB_PATH); cur = conn.cursor()
-        cur.execute("""INSERT INTO ids(name,student_id,course,year,department,phone,email,pdf_path)
-                       VALUES(?,?,?,?,?,?,?,?)""",
-                    (data["name"],data["student_id"],data["course"],data["year"],
-                     data["department"],data["phone"],data["email"],""))
-        conn.commit(); conn.close()
+        add_record(data)
         QtWidgets.QMessageBox.information(self, "Saved", "Record saved successfully!")
 
     def refresh(self):
         for w in (self.name,self.sid,self.course,self.year,self.phone,self.email): w.clear()
         self.dept.setCurrentIndex(0)
         self.bg=self.logo=self.photo=None
+        self.preview_timer.stop(); self.job_id += 1
         self.preview.clear()
         self.preview.setText("Preview will appear here\n(Click Generate Preview)")
 
@@ -378,20 +480,20 @@ class Dashboard(QtWidgets.QWidget):
             return
         path, _ = QtWidgets.QFileDialog.getSaveFileName(self,"Save PDF","","PDF Files (*.pdf)")
         if not path: return
-        img = generate_id(data,self.bg,self.logo,self.photo)
-        temp = tempfile.NamedTemporaryFile(delete=False,suffix=".png")
-        img.save(temp.name)
-        c = canvas.Canvas(path, pagesize=(ID_SIZE[0],ID_SIZE[1]))
-        c.drawImage(temp.name,0,0,width=ID_SIZE[0],height=ID_SIZE[1])
-        c.save(); os.remove(temp.name)
-        conn = sqlite3.connect(DB_PATH); cur = conn.cursor()
-        cur.execute("""INSERT INTO ids(name,student_id,course,year,department,phone,email,pdf_path)
-                       VALUES(?,?,?,?,?,?,?,?)""",
-                    (data["name"],data["student_id"],data["course"],data["year"],
-                     data["department"],data["phone"],data["email"],path))
-        conn.commit(); conn.close()
+        with span("save_pdf"), collect() as spans:
+            self.write_card_pdf(data, path)
+            with span("db.add_record"):
+                add_record(data, path)
+        self.show_profile(spans)
         QtWidgets.QMessageBox.information(self,"Saved","PDF saved successfully!")
 
+    def write_card_pdf(self, data, path):
+        # vector text/QR by default; EDUID_PDF_BACKEND=raster embeds the PNG card instead
+        if PDF_BACKEND == "vector":
+            write_vector_pdf(data, path, self.bg, self.logo, self.photo)
+        else:
+            write_pdf(generate_id(data,self.bg,self.logo,self.photo), path)
+
     # ----------------------- Records Page -----------------------
     def make_records_page(self):
         page = QtWidgets.QWidget(); page.setStyleSheet(f"background-color:{DASHBOARD_BG};")
@@ -407,6 +509,18 @@ class Dashboard(QtWidgets.QWidget):
         self.pdf_btn.setStyleSheet(f"background-color:{ACCENT_COLOR}; color:white; font-size:16px; border-radius:6px;")
         self.pdf_btn.clicked.connect(self.export_pdf)
 
+        self.bulk_btn = QtWidgets.QPushButton("Export Selection/All")
+        self.bulk_btn.setStyleSheet(f"background-color:{ACCENT_COLOR}; color:white; font-size:16px; border-radius:6px;")
+        self.bulk_btn.clicked.connect(self.export_bulk_pdf)
+
+        self.import_btn = QtWidgets.QPushButton("Import Roster")
+        self.import_btn.setStyleSheet(f"background-color:{ACCENT_COLOR}; color:white; font-size:16px; border-radius:6px;")
+        self.import_btn.clicked.connect(self.import_roster)
+
+        self.data_btn = QtWidgets.QPushButton("Export Data")
+        self.data_btn.setStyleSheet(f"background-color:{ACCENT_COLOR}; color:white; font-size:16px; border-radius:6px;")
+        self.data_btn.clicked.connect(self.export_data)
+
         self.search_btn = QtWidgets.QPushButton("Search by Student ID")
         self.search_btn.setStyleSheet(f"background-color:blue; color:white; font-size:16px; border-radius:6px;")
         self.search_btn.clicked.connect(self.search_record)
@@ -419,64 +533,180 @@ class Dashboard(QtWidgets.QWidget):
         # Add all buttons to layout
         btn_layout.addWidget(self.del_btn)
         btn_layout.addWidget(self.pdf_btn)
+        btn_layout.addWidget(self.bulk_btn)
+        btn_layout.addWidget(self.import_btn)
+        btn_layout.addWidget(self.data_btn)
         btn_layout.addWidget(self.search_btn)
         btn_layout.addWidget(self.refresh_btn)
 
         layout.addWidget(btn_frame)
 
-        self.table = QtWidgets.QTableWidget(); layout.addWidget(self.table)
+        # Type-ahead search: name, student ID, email, course or department
+        self.search_box = QtWidgets.QLineEdit(); self.search_box.setPlaceholderText("Search name, student ID, email, course...")
+        self.search_box.setFixedHeight(40); self.search_box.setStyleSheet("font-size:16px; background:white;")
+        self.search_timer = QtCore.QTimer(self); self.search_timer.setSingleShot(True); self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(lambda: self.load_records(search=self.search_box.text()))
+        self.search_box.textChanged.connect(self.search_timer.start)
+        layout.addWidget(self.search_box)
+
+        self.records = RecordsModel(self)
+        self.table = QtWidgets.QTableView(); self.table.setModel(self.records)
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table.setSortingEnabled(False)
+        self.table.horizontalHeader().setSortIndicatorShown(True)
+        self.table.horizontalHeader().sortIndicatorChanged.connect(self.records.sort)
+        layout.addWidget(self.table)
         return page
 
-    def load_records(self, filter_id=None):
-        conn = sqlite3.connect(DB_PATH); cur = conn.cursor()
+    def load_records(self, filter_id=None, search=None):
         if filter_id:
-            cur.execute("SELECT id,name,student_id,course,year,department,phone,email,pdf_path FROM ids WHERE student_id=?", (filter_id,))
+            self.records.set_rows(get_db().query(f"SELECT {RECORD_COLUMNS} FROM ids WHERE student_id=?", (filter_id,)))
+        elif search and search.strip():
+            self.records.set_rows(search_records(search))
         else:
-            cur.execute("SELECT id,name,student_id,course,year,department,phone,email,pdf_path FROM ids")
-        rows = cur.fetchall(); conn.close()
-        self.table.setRowCount(len(rows)); self.table.setColumnCount(9)
-        self.table.setHorizontalHeaderLabels(["ID","Name","Student ID","Course","Year","Dept","Phone","Email","PDF Path"])
-        for i,r in enumerate(rows):
-            for j,val in enumerate(r):
-                self.table.setItem(i,j,QtWidgets.QTableWidgetItem(str(val)))
+            self.records.refresh()
         self.table.resizeColumnsToContents()
-        if filter_id and not rows:
+        if filter_id and not self.records.rows:
             QtWidgets.QMessageBox.information(self, "Not Found", "Student not found!")
 
     def delete_record(self):
-        sel = self.table.currentRow()
+        sel = self.table.currentIndex().row()
         if sel < 0: return
-        student_id = self.table.item(sel,2).text()
-        conn = sqlite3.connect(DB_PATH); cur = conn.cursor()
-        cur.execute("DELETE FROM ids WHERE student_id=?", (student_id,))
-        conn.commit(); conn.close()
+        student_id = self.records.student_id(sel)
+        get_db().execute("DELETE FROM ids WHERE student_id=?", (student_id,))
         self.load_records()
         QtWidgets.QMessageBox.information(self,"Deleted","Record deleted successfully!")
 
     def export_pdf(self):
-        sel = self.table.currentRow()
+        sel = self.table.currentIndex().row()
         if sel < 0: return
-        student_id = self.table.item(sel,2).text()
-        conn = sqlite3.connect(DB_PATH); cur = conn.cursor()
-        cur.execute("SELECT name,student_id,course,year,department,phone,email FROM ids WHERE student_id=?", (student_id,))
-        row = cur.fetchone(); conn.close()
-        if row:
-            data = {"name":row[0],"student_id":row[1],"course":row[2],"year":row[3],"department":row[4],"phone":row[5],"email":row[6]}
+        student_id = self.records.student_id(sel)
+        data = next(iter_records([student_id]), None)
+        if data:
             path, _ = QtWidgets.QFileDialog.getSaveFileName(self,"Export PDF","","PDF Files (*.pdf)")
             if not path: return
-            img = generate_id(data,self.bg,self.logo,self.photo)
-            temp = tempfile.NamedTemporaryFile(delete=False,suffix=".png")
-            img.save(temp.name)
-            c = canvas.Canvas(path, pagesize=(ID_SIZE[0],ID_SIZE[1]))
-            c.drawImage(temp.name,0,0,width=ID_SIZE[0],height=ID_SIZE[1])
-            c.save(); os.remove(temp.name)
+            with span("export_pdf"), collect() as spans:
+                self.write_card_pdf(data, path)
+            self.show_profile(spans)
             QtWidgets.QMessageBox.information(self,"Saved","PDF exported successfully!")
 
+    def export_bulk_pdf(self):
+        rows = sorted({i.row() for i in self.table.selectedIndexes()})
+        ids = [self.records.student_id(r) for r in rows] or None
+        n = count_records() if ids is None else len(ids)
+        if not n: return
+        layouts = ["One card per page", "A4 sheet (N-up)", "Letter sheet (N-up)"]
+        choice, ok = QtWidgets.QInputDialog.getItem(self, "Export", f"Export {n} cards as:", layouts, 0, False)
+        if not ok: return
+        paper = {1: "A4", 2: "Letter"}.get(layouts.index(choice))
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self,"Export PDF","","PDF Files (*.pdf)")
+        if not path: return
+
+        prog = QtWidgets.QProgressDialog(f"Exporting {n} cards...", "Cancel", 0, n, self)
+        prog.setWindowModality(QtCore.Qt.WindowModal); prog.setMinimumDuration(300)
+        def cards():
+            # rendered one at a time and written straight to the PDF, so memory stays flat
+            for rec in iter_records(ids):
+                if prog.wasCanceled(): break
+                yield rec if PDF_BACKEND == "vector" else generate_id(rec, self.bg, self.logo, None, upload=False)
+        if PDF_BACKEND == "vector":
+            jobs = ((rec, self.bg, self.logo, None, False) for rec in cards())
+            done, files = write_vector_cards(jobs, path, paper, prog.setValue, BULK_PDF_SPLIT)
+        else:
+            done, files = write_cards(cards(), path, ID_SIZE, paper, prog.setValue), 1
+        prog.close()
+        parts = f" in {files} files ({os.path.basename(path)}, {os.path.basename(part_path(path, 2))}, ...)" if files > 1 else ""
+        QtWidgets.QMessageBox.information(self,"Saved",f"{done} cards exported to PDF{parts}!")
+
+    def import_roster(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Import Roster", "", "Rosters (*.csv *.xlsx *.json *.jsonl)")
+        if not path: return
+        rejects = []
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            counts = import_roster(path, rejects=rejects)
+        except Exception as e:
+            QtWidgets.QMessageBox.warning(self, "Error", f"Import failed: {e}")
+            return
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+        self.load_records()
+        msg = "{inserted} inserted, {updated} updated, {skipped} skipped, {rejected} rejected".format(**counts)
+        if rejects:
+            msg += "\n\n" + "\n".join(f"Row {n}: {err}" for n, _, err in rejects[:10])
+        QtWidgets.QMessageBox.information(self, "Imported", msg)
+
+    def export_data(self):
+        filters = {"CSV (*.csv)": "csv", "JSON Lines (*.jsonl)": "jsonl", "Parquet (*.parquet)": "parquet"}
+        path, chosen = QtWidgets.QFileDialog.getSaveFileName(self, "Export Data", "", ";;".join(filters))
+        if not path: return
+        fmt = filters.get(chosen, "csv")
+        if not os.path.splitext(path)[1]:
+            path += "." + fmt
+        # streamed from the database in batches: memory stays flat however many records there are
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            n = export_records(path, fmt)
+        except Exception as e:
+            QtWidgets.QMessageBox.warning(self, "Error", f"Export failed: {e}")
+            return
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+        QtWidgets.QMessageBox.information(self, "Exported", f"{n} records exported to {os.path.basename(path)}")
+
     def search_record(self):
         text, ok = QtWidgets.QInputDialog.getText(self,"Search","Enter Student ID:")
         if ok and text.strip():
             self.load_records(filter_id=text.strip())
 
+    # ----------------------- Render Jobs Page -----------------------
+    def make_jobs_page(self):
+        page = QtWidgets.QWidget(); page.setStyleSheet(f"background-color:{DASHBOARD_BG};")
+        layout = QtWidgets.QVBoxLayout(page)
+        btn_frame = QtWidgets.QFrame(); btn_layout = QtWidgets.QHBoxLayout(btn_frame)
+        for txt, fn in [("Queue All Records", self.queue_jobs), ("Start Workers", self.start_workers),
+                        ("Retry Failed", lambda: (retry_failed(), self.load_jobs()))]:
+            b = QtWidgets.QPushButton(txt)
+            b.setStyleSheet(f"background-color:{ACCENT_COLOR}; color:white; font-size:16px; border-radius:6px;")
+            b.clicked.connect(fn)
+            btn_layout.addWidget(b)
+        layout.addWidget(btn_frame)
+
+        self.jobs_bar = QtWidgets.QProgressBar(); self.jobs_bar.setFixedHeight(30)
+        layout.addWidget(self.jobs_bar)
+        self.jobs_table = QtWidgets.QTableWidget(0, 6)
+        self.jobs_table.setHorizontalHeaderLabels(["Batch", "Total", "Done", "Pending", "Running", "Failed"])
+        self.jobs_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.jobs_table)
+
+        # workers run as separate processes; the page polls the render_jobs table while it is shown
+        self.jobs_timer = QtCore.QTimer(self); self.jobs_timer.setInterval(1000)
+        self.jobs_timer.timeout.connect(lambda: self.stack.currentIndex() == 2 and self.load_jobs())
+        self.jobs_timer.start()
+        return page
+
+    def load_jobs(self):
+        batches = job_progress()
+        self.jobs_table.setRowCount(len(batches))
+        for r, b in enumerate(batches):
+            for c, k in enumerate(("batch", "total", "done", "pending", "running", "failed")):
+                self.jobs_table.setItem(r, c, QtWidgets.QTableWidgetItem(str(b[k])))
+        total = sum(b["total"] for b in batches)
+        self.jobs_bar.setRange(0, max(total, 1))
+        self.jobs_bar.setValue(sum(b["done"] + b["failed"] for b in batches))
+
+    def queue_jobs(self):
+        out = QtWidgets.QFileDialog.getExistingDirectory(self, "Save cards to")
+        if not out: return
+        batch, n = enqueue(out_dir=out, bg=self.bg, logo=self.logo)
+        self.load_jobs()
+        QtWidgets.QMessageBox.information(self, "Queued", f"{n} cards queued in {batch}.\nClick Start Workers to render them.")
+
+    def start_workers(self):
+        # detached, so a batch keeps going (and stays resumable) if the app is closed
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.py")
+        QtCore.QProcess.startDetached(sys.executable, [script, "run", "-j", str(max(1, (os.cpu_count() or 2) - 1))])
+
     def logout(self):
         self.l = Login(); self.l.show(); self.close()
 
@@ -0,0 +1,134 @@
+# roster files (csv/xlsx/json) and the ids table as streams of record dicts
+import os, re, csv, json
+
+from db import RECORD_FIELDS, count_records, iter_records
+
+# roster header -> ids column, for headers that do not already use the column names
+ALIASES = {"full_name": "name", "student_name": "name", "id": "student_id", "roll_no": "student_id",
+           "student_no": "student_id", "dept": "department", "mobile": "phone", "phone_no": "phone",
+           "email_address": "email", "e_mail": "email"}
+
+# -------- VALIDATION --------
+def validate_email(e):
+    return bool(re.match(r"[^@]+@[^@]+\.[^@]+", e))
+
+# -------- COLUMN MAPPING --------
+def parse_mapping(text):
+    # "Roll Number=student_id,Full Name=name" -> {"roll number": "student_id", ...}
+    mapping = {}
+    for pair in filter(None, (p.strip() for p in (text or "").split(","))):
+        src, _, dst = pair.partition("=")
+        if dst.strip() not in RECORD_FIELDS:
+            raise ValueError(f"Unknown column in mapping: {dst.strip()!r}")
+        mapping[src.strip().lower()] = dst.strip()
+    return mapping
+
+def map_row(row, mapping=None):
+    # roster headers -> ids column names (explicit mapping, then ALIASES); other columns such as
+    # "photo" pass through under their normalised name
+    out = {}
+    for k, v in row.items():
+        k = str(k).strip().lower()
+        norm = re.sub(r"[\s-]+", "_", k)   # "E-mail", "Roll No" -> e_mail, roll_no
+        out[(mapping or {}).get(k) or ALIASES.get(norm) or norm] = v
+    return out
+
+# -------- ROSTER READERS --------
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            yield {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+
+def read_xlsx(path, sheet=None):
+    # optional dependency: openpyxl, read-only mode streams rows instead of loading the workbook
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("Reading .xlsx rosters needs openpyxl (pip install openpyxl)")
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = (wb[sheet] if sheet else wb.active).iter_rows(values_only=True)
+        header = [str(h).strip().lower() if h is not None else "" for h in next(rows, ())]
+        for row in rows:
+            if any(v is not None for v in row):
+                yield {k: "" if v is None else str(v).strip() for k, v in zip(header, row) if k}
+    finally:
+        wb.close()
+
+def read_json(path):
+    # a JSON array of objects, or one object per line (JSON lines); both are decoded a record at a time
+    with open(path, encoding="utf-8") as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            yield from _json_array(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+_SEP = re.compile(r"\s*[,\]]")
+
+def _json_array(f, chunk=1 << 16):
+    # the elements of a top-level array without loading the whole document: raw_decode one element
+    # from a buffer that holds at most the current element plus one chunk
+    dec = json.JSONDecoder()
+    buf = ""
+    while "[" not in buf:   # leading whitespace may be longer than a chunk
+        more = f.read(chunk)
+        if not more:
+            raise ValueError(f"{f.name}: expected a JSON array")
+        buf += more
+    pos, eof = buf.index("[") + 1, False
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos == len(buf) or not eof and len(buf) - pos < chunk:
+            more = f.read(chunk)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            if eof and not buf:
+                raise ValueError(f"{f.name}: unterminated JSON array")
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            obj, end = dec.raw_decode(buf, pos)
+            if not _SEP.match(buf, end):   # e.g. a number cut at the end of the buffer
+                raise json.JSONDecodeError("Expecting ',' delimiter", buf, end)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more = f.read(chunk)   # element longer than what is buffered
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+        yield obj
+        pos = end
+
+def read_db(db_path=None):
+    return iter_records(path=db_path)
+
+def read_roster(source, mapping=None):
+    # record dicts keyed by ids column names, whichever tool reads the file (importer, batch_render)
+    if source is None:
+        return read_db()
+    ext = os.path.splitext(source)[1].lower()
+    if ext == ".csv":
+        rows = read_csv(source)
+    elif ext in (".xlsx", ".xlsm"):
+        rows = read_xlsx(source)
+    elif ext in (".json", ".jsonl"):
+        rows = read_json(source)
+    elif ext in (".db", ".sqlite", ".sqlite3"):
+        return read_db(source)
+    else:
+        raise ValueError(f"Unsupported roster format: {source}")
+    return (map_row(r, mapping) for r in rows)
+
+def count_roster(source):
+    if source is None or os.path.splitext(source)[1].lower() in (".db", ".sqlite", ".sqlite3"):
+        return count_records(source)
+    return None
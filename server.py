@@ -0,0 +1,238 @@
+# local HTTP card service without Qt: POST a record or GET a stored student, get PNG/PDF bytes back
+import os, io, sys, json, argparse, threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, quote, unquote
+
+from db import RECORD_FIELDS, init_db, iter_records
+from card_core import CARD_CACHE, generate_id, pdf_bytes
+from metrics import drain, merge, span, prometheus_text
+from pdf_vector import BACKEND, write_vector_pdf
+
+# -------- CONFIG --------
+MAX_BODY = 64 * 1024     # bytes of JSON accepted per POST
+RENDER_TIMEOUT = 60      # seconds a request waits for its card before a 504
+TYPES = {"png": "image/png", "pdf": "application/pdf"}
+
+# -------- WORKER --------
+_opts = {}
+
+def _init_worker(opts):
+    _opts.update(opts)
+
+def resolve_photo(name):
+    # photos are only read from --photo-dir; anything that would step outside it is ignored
+    root = _opts.get("photo_dir")
+    if not name or not root:
+        return None
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([path, os.path.realpath(root)]) != os.path.realpath(root):
+        return None
+    return path
+
+def render_card(data, photo, fmt, upload):
+    # runs in a pool worker; returns the encoded card
+    bg, logo, photo = _opts.get("bg"), _opts.get("logo"), resolve_photo(photo)
+    if fmt == "pdf" and BACKEND == "vector":
+        buf = io.BytesIO()
+        write_vector_pdf(data, buf, bg, logo, photo, upload)
+        return buf.getvalue()
+    if CARD_CACHE is not None:
+        key, _, _ = CARD_CACHE.render(data, bg, logo, photo, upload, save=False)
+        with open(CARD_CACHE.pdf(key) if fmt == "pdf" else CARD_CACHE.png(key), "rb") as f:
+            return f.read()
+    img = generate_id(data, bg, logo, photo, upload, cache=False, save=False)
+    if fmt == "pdf":
+        return pdf_bytes(img)
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+def render_task(data, photo, fmt, upload):
+    # process-pool entry: the card plus this worker's span stats, merged into the server's /metrics
+    return render_card(data, photo, fmt, upload), drain()
+
+# -------- SERVICE --------
+class CardService:
+    # worker pool plus a bounded queue: at most workers + queue renders are admitted at once,
+    # anything beyond that is refused straight away (429) instead of piling up
+    def __init__(self, workers=None, queue=64, threads=False, **opts):
+        self.workers = workers or os.cpu_count() or 1
+        self.capacity = self.workers + queue
+        _init_worker(opts)
+        self.threads = threads
+        if threads:
+            self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix="render")
+        else:
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(opts,))
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self.stats = {"rendered": 0, "rejected": 0, "failed": 0, "in_flight": 0}
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def render(self, data, photo=None, fmt="png", upload=False):
+        # -> card bytes, or None when saturated
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            return None
+        self._count("in_flight")
+        try:
+            fut = self.pool.submit(render_card if self.threads else render_task, data, photo, fmt, upload)
+        except Exception:
+            self._done(None)
+            raise
+        fut.add_done_callback(self._done)   # the slot stays taken until the render ends, even past a timeout
+        out = fut.result(RENDER_TIMEOUT)
+        if not self.threads:   # process workers send their spans back with the card
+            out, stats = out
+            merge(stats)
+        return out
+
+    def _done(self, fut):
+        self._count("failed" if fut is None or fut.cancelled() or fut.exception() else "rendered")
+        self._count("in_flight", -1)
+        self._slots.release()
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive: every response carries a Content-Length
+    server_version = "EduIDCards/1.0"
+    disable_nagle_algorithm = True  # headers and body go out as separate writes; don't wait on delayed ACKs
+    service = None                  # set by make_server
+    db_path = None
+
+    def _send(self, code, body, ctype="application/json", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _error(self, code, msg, headers=None):
+        self._send(code, {"error": msg}, headers=headers)
+
+    def _card(self, data, photo, fmt, upload):
+        if not data.get("name") or not data.get("student_id"):
+            return self._error(400, "name and student_id are required")
+        if any(c in data["student_id"] for c in ("/", "\\", "\0")):   # it names generated_cards/<id>_card.png
+            return self._error(400, "student_id must not contain path separators")
+        try:
+            out = self.service.render(data, photo, fmt, upload)
+        except FutureTimeout:
+            return self._error(504, "render timed out")
+        except Exception as e:
+            return self._error(500, f"{type(e).__name__}: {e}")
+        if out is None:
+            return self._error(429, "render queue full", {"Retry-After": "1"})
+        name = quote(f"{data['student_id']}_card.{fmt}", safe="")   # RFC 5987: any student_id, ASCII header
+        self._send(200, out, TYPES[fmt], {"Content-Disposition": f"inline; filename*=UTF-8''{name}"})
+
+    def _format(self, query, default="png"):
+        fmt = (query.get("format") or [default])[0]
+        return fmt.lower() if isinstance(fmt, str) and fmt.lower() in TYPES else None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        parts = [unquote(p) for p in url.path.split("/") if p]
+        if parts == ["health"]:
+            return self._send(200, dict(self.service.stats, workers=self.service.workers,
+                                        capacity=self.service.capacity))
+        if parts == ["metrics"]:
+            return self._send(200, prometheus_text().encode(), "text/plain; version=0.0.4")
+        if len(parts) != 2 or parts[0] != "cards":
+            return self._error(404, "not found")
+        # /cards/<student_id>, /cards/<student_id>.pdf or ?format=pdf
+        sid, ext = parts[1], None
+        for f in TYPES:
+            if sid.endswith("." + f):
+                sid, ext = sid[:-len(f) - 1], f
+        fmt = ext or self._format(query)
+        if fmt is None:
+            return self._error(400, "format must be png or pdf")
+        with span("http.get_card"):
+            rec = next(iter_records([sid], path=self.db_path), None)
+            if rec is None:
+                return self._error(404, f"no student {sid!r}")
+            self._card({k: rec.get(k) or "" for k in RECORD_FIELDS}, (query.get("photo") or [None])[0], fmt,
+                       (query.get("upload") or ["0"])[0] == "1")
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") != "/cards":
+            return self._error(404, "not found")
+        try:
+            n = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            n = -1
+        if n < 0:
+            self.close_connection = True
+            return self._error(400, "bad Content-Length")
+        if n > MAX_BODY:
+            self.close_connection = True   # the unread body would be parsed as the next request
+            return self._error(413, "record too large")
+        try:
+            rec = json.loads(self.rfile.read(n) or b"{}")
+            if not isinstance(rec, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            return self._error(400, f"bad JSON: {e}")
+        query = parse_qs(url.query)
+        fmt = self._format(query, rec.get("format") or "png")
+        if fmt is None:
+            return self._error(400, "format must be png or pdf")
+        with span("http.post_card"):
+            self._card({k: str(rec.get(k) or "") for k in RECORD_FIELDS}, rec.get("photo"), fmt,
+                       bool(rec.get("upload")) or (query.get("upload") or ["0"])[0] == "1")
+
+    def log_message(self, fmt, *args):
+        if not self.server.quiet:
+            sys.stderr.write("%s - %s\n" % (self.address_string(), fmt % args))
+
+def make_server(host="127.0.0.1", port=8765, service=None, db_path=None, quiet=False):
+    handler = type("CardHandler", (Handler,), {"service": service, "db_path": db_path})
+    srv = ThreadingHTTPServer((host, port), handler)
+    srv.daemon_threads = True
+    srv.quiet = quiet
+    return srv
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve ID cards over HTTP (no GUI).")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("-j", "--workers", type=int, default=None, help="render workers (default: CPU count)")
+    ap.add_argument("--queue", type=int, default=64, help="renders allowed to wait for a worker before 429s")
+    ap.add_argument("--threads", action="store_true", help="render in threads instead of processes")
+    ap.add_argument("--bg", help="background image")
+    ap.add_argument("--logo", help="logo image")
+    ap.add_argument("--photo-dir", help="directory that record 'photo' names are read from")
+    ap.add_argument("-q", "--quiet", action="store_true", help="no per-request log lines")
+    a = ap.parse_args(argv)
+
+    init_db()
+    service = CardService(a.workers, a.queue, a.threads, bg=a.bg, logo=a.logo, photo_dir=a.photo_dir)
+    srv = make_server(a.host, a.port, service, quiet=a.quiet)
+    print(f"Serving cards on http://{a.host}:{srv.server_address[1]}/ "
+          f"({service.workers} workers, queue {a.queue})", file=sys.stderr)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close(); service.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+# card cache: every record is stored under its own key with its own card, whatever else shares its student_id
+import os, sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import card_core
+from card_core import CardCache, generate_id, generate_ids
+
+def _cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)   # generated_cards/ goes to the working directory
+    cache = CardCache(str(tmp_path / "cache"))
+    monkeypatch.setattr(card_core, "CARD_CACHE", cache)
+    return cache
+
+def _job(name):
+    return {"name": name, "student_id": "7", "course": "BSc"}, None, None, None, False
+
+def test_duplicate_student_id_in_one_batch(tmp_path, monkeypatch):
+    _cache(tmp_path, monkeypatch)
+    a, b = _job("Alice"), _job("Bob")
+    want_a = generate_id(*a, cache=False).tobytes()
+    want_b = generate_id(*b, cache=False).tobytes()
+    assert want_a != want_b
+
+    got_a, got_b = generate_ids([a, b])
+    assert got_a.tobytes() == want_a and got_b.tobytes() == want_b
+    # and the cache keeps the right card for each record afterwards
+    assert generate_id(*a).tobytes() == want_a
+    assert generate_id(*b).tobytes() == want_b
+
+def test_concurrent_renders_of_one_student_id(tmp_path, monkeypatch):
+    _cache(tmp_path, monkeypatch)
+    jobs = [_job(f"Student {i}") for i in range(16)]
+    want = [generate_id(*j, cache=False).tobytes() for j in jobs]
+    with ThreadPoolExecutor(16) as pool:
+        list(pool.map(lambda j: generate_id(*j), jobs))
+    assert [generate_id(*j).tobytes() for j in jobs] == want
+
+def test_preview_render_writes_nothing(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch)
+    img = generate_id(*_job("Alice"), cache=False, save=False)
+    assert img.size == card_core.ID_SIZE
+    assert not (tmp_path / "generated_cards").exists() and not os.path.exists(cache.root)
+
+def test_render_preview_fits_the_label(tmp_path, monkeypatch):
+    _cache(tmp_path, monkeypatch)
+    img = card_core.render_preview(*_job("Alice")[:4], (450, 650))
+    assert img.size == (410, 650) and img.mode == "RGB"
+    assert not (tmp_path / "generated_cards").exists()
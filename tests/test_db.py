@@ -0,0 +1,57 @@
+# ids table: migrations and keyset paging
+import os, sys, sqlite3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import db
+
+def _old_db(tmp_path, rows):
+    # an ids table from before migration 1: no unique student_id, user_version 0
+    path = str(tmp_path / "ids.db")
+    con = sqlite3.connect(path)
+    con.execute("""CREATE TABLE ids(id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, student_id TEXT, course TEXT,
+                   year TEXT, department TEXT, phone TEXT, email TEXT, pdf_path TEXT)""")
+    con.executemany("INSERT INTO ids(name,student_id,course,pdf_path) VALUES(?,?,?,?)", rows)
+    con.commit(); con.close()
+    return path
+
+def test_migration_sets_duplicates_aside(tmp_path):
+    path = _old_db(tmp_path, [("Alice", "7", "BSc", "/a.pdf"), ("Bob", "7", "BSc", ""),
+                              ("Carol", "8", "BSc", "/c.pdf"), ("Carol", "8", "BSc", None), ("Dan", "9", "BSc", "")])
+    db.init_db(path)
+    d = db.get_db(path)
+    # Bob is the newest "7" but not Alice: he keeps no PDF. Carol's re-save keeps her own PDF.
+    assert d.query("SELECT name,student_id,pdf_path FROM ids ORDER BY id") == [
+        ("Bob", "7", ""), ("Carol", "8", "/c.pdf"), ("Dan", "9", "")]
+    assert d.query("SELECT id,name,student_id,pdf_path FROM ids_duplicates ORDER BY id") == [
+        (1, "Alice", "7", "/a.pdf"), (3, "Carol", "8", "/c.pdf")]
+    assert d.query_one("SELECT COUNT(*) FROM sqlite_master WHERE name='idx_ids_student_id'")[0] == 1
+
+def _roster_db(tmp_path):
+    path = str(tmp_path / "roster.db")
+    db.init_db(path)
+    courses = ["BSc", None, "", "MSc", "BSc", "bsc", None, "Álgebra", "BSc", ""]
+    for i in range(60):
+        db.add_record({"name": f"S{i % 7}" if i % 5 else None, "student_id": str(1000 - i),
+                       "course": courses[i % len(courses)], "year": str(i % 4) if i % 3 else ""}, path=path)
+    return path
+
+@pytest.mark.parametrize("sort", ["id", "name", "student_id", "course", "year", "pdf_path"])
+@pytest.mark.parametrize("desc", [False, True])
+@pytest.mark.parametrize("limit", [1, 4, 7, 200])
+def test_page_records_walks_the_full_order(tmp_path, sort, desc, limit):
+    path = _roster_db(tmp_path)
+    order = "DESC" if desc else "ASC"
+    key = "id" if sort == "id" else f"COALESCE({sort},'')"
+    want = db.get_db(path).query(f"SELECT {db.RECORD_COLUMNS} FROM ids ORDER BY {key} {order}, id {order}")
+    col = db.RECORD_COLUMNS.split(",").index(sort)
+    got, after = [], None
+    while True:
+        page = db.page_records(sort, desc, after, limit, path)
+        got += page
+        if len(page) < limit:
+            break
+        after = (page[-1][col], page[-1][0])   # what the records view passes: the raw value, NULL included
+    assert got == want
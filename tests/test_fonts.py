@@ -0,0 +1,30 @@
+# fonts: a missing Arial falls back to an installed stand-in, or PIL's default at the asked size
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import card_core
+
+@pytest.fixture(autouse=True)
+def _font_path():
+    saved = list(card_core.FONT_PATH)
+    yield
+    card_core.set_font_path(saved)
+
+def test_substitute_for_missing_arial(tmp_path):
+    src = next((os.path.join(d, "DejaVuSans.ttf") for d in card_core.FONT_PATH
+                if os.path.exists(os.path.join(d, "DejaVuSans.ttf"))), None)
+    if src is None:
+        pytest.skip("DejaVuSans.ttf not installed")
+    (tmp_path / "DejaVuSans.ttf").write_bytes(open(src, "rb").read())
+    card_core.set_font_path([str(tmp_path)])
+    assert card_core.find_font("arial.ttf") == str(tmp_path / "DejaVuSans.ttf")
+    assert card_core.find_font("arialbd.ttf") is None
+
+def test_default_font_keeps_the_size():
+    card_core.set_font_path([])
+    assert card_core.find_font("arial.ttf") is None
+    big, small = card_core.get_font("arial.ttf", 40), card_core.get_font("arial.ttf", 16)
+    assert big.getbbox("Hg")[3] > 2 * small.getbbox("Hg")[3]
@@ -0,0 +1,55 @@
+# render queue: a worker whose lease was taken over must not overwrite the new owner's outcome
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import db
+import jobs
+import card_core
+import pdf_vector
+
+def _queue(tmp_path, **kw):
+    path = str(tmp_path / "ids.db")
+    db.init_db(path)
+    db.get_db(path).execute(db.INSERT_RECORD, ("Test Student", "S1", "BSc", "1", "IT", "", "", ""))
+    jobs.enqueue(["S1"], batch="b", out_dir=str(tmp_path), path=path, **kw)
+    return path
+
+def _state(path):
+    return db.get_db(path).query_one("SELECT status, worker FROM render_jobs")
+
+def test_lease_takeover(tmp_path, monkeypatch):
+    path = _queue(tmp_path)
+    monkeypatch.setattr(jobs, "LEASE", -1)   # every lease is already expired
+    old, = jobs.claim("host:1", path=path)
+    new, = jobs.claim("host:2", path=path)
+    assert old["id"] == new["id"] and _state(path) == ("running", "host:2")
+
+    assert jobs.complete(new, path)
+    assert not jobs.fail(old, "late failure", path=path)
+    assert not jobs.complete(old, path)
+    assert _state(path) == ("done", "host:2")
+    assert db.get_db(path).query_one("SELECT error FROM render_jobs") == (None,)
+
+def test_fail_after_takeover_keeps_running(tmp_path, monkeypatch):
+    path = _queue(tmp_path)
+    monkeypatch.setattr(jobs, "LEASE", -1)
+    old, = jobs.claim("host:1", path=path)
+    jobs.claim("host:2", path=path)
+    assert not jobs.fail(old, "late failure", path=path)
+    assert _state(path) == ("running", "host:2")
+
+@pytest.mark.parametrize("fmt, backend", [("png", "raster"), ("pdf", "raster"), ("pdf", "vector")])
+def test_uncached_upload_job_uploads_once(tmp_path, monkeypatch, fmt, backend):
+    monkeypatch.chdir(tmp_path)
+    path = _queue(tmp_path, fmt=fmt, upload=True)
+    sent = []
+    monkeypatch.setattr(card_core, "upload_to_imgbb", lambda p: sent.append(p) or "https://i.ibb.co/x/card.png")
+    monkeypatch.setattr(jobs, "CARD_CACHE", None)
+    monkeypatch.setattr(jobs, "BACKEND", backend)
+    monkeypatch.setattr(pdf_vector, "CARD_CACHE", None)
+    job, = jobs.claim("host:1", path=path)
+    jobs.render_job(job, path)
+    assert len(sent) == 1 and os.path.getsize(job["out_path"]) > 0
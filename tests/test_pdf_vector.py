@@ -0,0 +1,31 @@
+# vector PDF backend: embedded assets keep their transparency, like the raster card
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+import card_core
+import pdf_vector
+
+def _logo(tmp_path):
+    # transparent apart from a red square in the middle
+    path = str(tmp_path / "logo.png")
+    im = Image.new("RGBA", (300, 300), (0, 0, 0, 0))
+    ImageDraw.Draw(im).rectangle((100, 100, 200, 200), fill=(200, 0, 0, 255))
+    im.save(path)
+    return path
+
+def test_transparent_logo_raster(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    img = card_core.generate_id({"name": "A", "student_id": "1"}, None, _logo(tmp_path), None, upload=False,
+                                cache=False, save=False)
+    assert img.getpixel((45, 85)) == (255, 255, 255)   # inside the ellipse, transparent in the logo
+    assert img.getpixel((85, 85)) == (200, 0, 0)
+
+def test_transparent_logo_vector(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    out = tmp_path / "card.pdf"
+    pdf_vector.write_vector_pdf({"name": "A", "student_id": "1"}, str(out), None, _logo(tmp_path), None,
+                                upload=False)
+    assert b"/SMask" in out.read_bytes()
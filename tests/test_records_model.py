@@ -0,0 +1,74 @@
+# records view: refresh() applies inserts, updates and deletes to partly loaded pages in the SQL order
+import os, sys, random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest
+
+QtCore = pytest.importorskip("PySide6.QtCore")
+
+import db
+import python_mini_project_app as app
+
+_qapp = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])   # kept alive for the whole run
+COURSES = ["BSc", None, "", "MSc", "bsc", "Álgebra"]
+
+def _order(sort_col, desc):
+    col = app.RecordsModel.COLUMNS[sort_col]
+    key = "id" if col == "id" else f"COALESCE({col},'')"
+    order = "DESC" if desc else "ASC"
+    return db.get_db().query(f"SELECT {db.RECORD_COLUMNS} FROM ids ORDER BY {key} {order}, id {order}")
+
+def _record(rng, sid):
+    return {"name": rng.choice(["Ann", "Bob", None, "Zoë"]), "student_id": str(sid),
+            "course": rng.choice(COURSES), "year": rng.choice(["1", "2", None])}
+
+@pytest.mark.parametrize("sort_col", [0, 1, 3, 4])
+@pytest.mark.parametrize("desc", [False, True])
+def test_refresh_matches_sql_order(tmp_path, monkeypatch, sort_col, desc):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "ids.db"))
+    monkeypatch.setattr(app.RecordsModel, "PAGE", 5)
+    db.init_db()
+    rng = random.Random(sort_col * 2 + desc)
+    for i in range(30):
+        db.add_record(_record(rng, i))
+    m = app.RecordsModel()
+    m.sort(sort_col, QtCore.Qt.DescendingOrder if desc else QtCore.Qt.AscendingOrder)
+    m.fetchMore()   # two of six pages loaded
+    conn, sid = db.get_db(), 100
+    for _ in range(20):
+        ids = [r for (r,) in conn.query("SELECT id FROM ids")]
+        for _ in range(rng.randint(1, 4)):
+            op = rng.choice(["insert", "update", "update_key", "delete"])
+            if op == "insert":
+                db.add_record(_record(rng, sid)); sid += 1
+            elif op == "delete" and ids:
+                conn.execute("DELETE FROM ids WHERE id=?", (ids.pop(rng.randrange(len(ids))),))
+            elif ids:
+                col = "phone" if op == "update" else rng.choice(["name", "course", "year"])
+                conn.execute(f"UPDATE ids SET {col}=? WHERE id=?", (rng.choice(COURSES), rng.choice(ids)))
+        m.refresh()
+        want = _order(sort_col, desc)
+        assert m.rows == want[:len(m.rows)]   # the loaded rows are exactly a prefix of the full order
+        assert m.by_id == {r[0]: r for r in m.rows}
+    while m.canFetchMore():
+        m.fetchMore()
+    assert m.rows == _order(sort_col, desc)
+
+def test_changes_since(tmp_path):
+    path = str(tmp_path / "ids.db")
+    db.init_db(path)
+    for i in range(3):
+        db.add_record({"name": f"S{i}", "student_id": str(i)}, path=path)
+    seq, conn = db.change_seq(path), db.get_db(path)
+    assert db.changes_since(seq, path=path) == (seq, {})
+    conn.execute("UPDATE ids SET name='T' WHERE id=1")
+    conn.execute("DELETE FROM ids WHERE id=2")
+    conn.execute("UPDATE ids SET name='U' WHERE id=1")
+    new, rows = db.changes_since(seq, path=path)
+    assert new == seq + 3 and rows.keys() == {1, 2}
+    assert rows[1][1] == "U" and rows[2] is None
+    assert db.changes_since(seq, 2, path) is None             # more changes than the caller wants to apply
+    conn.execute("DELETE FROM ids_log WHERE seq<=?", (seq + 1,))
+    assert db.changes_since(seq, path=path) is None           # the log no longer reaches back: reload
@@ -0,0 +1,33 @@
+# roster readers: the streamed JSON array decodes exactly like json.load, wherever the chunks split it
+import io, os, sys, json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from roster import _json_array, read_json
+
+DOC = (' \n [ {"name": "Ann \\"A\\" Lee", "student_id": "1", "course": "B[Sc], ]"},\n'
+       '{"name": "Zoë 名", "student_id": "22", "year": 2024, "tags": [1, [2, {"x": null}]]} ,'
+       ' 12345, -1.5e3, "s,]", true, null, [], {} ]\n')
+
+def _stream(text):
+    f = io.StringIO(text)
+    f.name = "roster.json"
+    return f
+
+@pytest.mark.parametrize("chunk", range(1, len(DOC) + 2))
+def test_json_array_any_chunk_boundary(chunk):
+    assert list(_json_array(_stream(DOC), chunk)) == json.loads(DOC)
+
+@pytest.mark.parametrize("chunk", [1, 3, 7, 64])
+def test_json_array_truncated(chunk):
+    with pytest.raises(ValueError):
+        list(_json_array(_stream(DOC.rstrip()[:-1]), chunk))
+    with pytest.raises(ValueError):
+        list(_json_array(_stream('[{"name": "A"}, 123'), chunk))
+
+def test_read_json_array_file(tmp_path):
+    path = tmp_path / "roster.json"
+    path.write_text(DOC, encoding="utf-8")
+    assert list(read_json(str(path))) == json.loads(DOC)
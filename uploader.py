@@ -0,0 +1,145 @@
+# card uploader: pooled keep-alive session, bounded concurrency, timeouts, retries, streamed bodies
+import os, time, uuid, random, threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# -------- CONFIG --------
+UPLOAD_URL = os.environ.get("EDUID_UPLOAD_URL", "https://api.imgbb.com/1/upload")
+API_KEY = os.environ.get("IMGBB_API_KEY", "f59c4fbcf150b55e7f0d732d71d97a38")  # Replace with your actual key
+RETRY_STATUS = {429, 500, 502, 503, 504}
+CHUNK = 64 * 1024
+
+# -------- STREAMED MULTIPART BODY --------
+class MultipartStream:
+    # multipart/form-data body read from disk in chunks; has a length so requests sends Content-Length
+    def __init__(self, fields, file_field, path):
+        self.boundary = uuid.uuid4().hex
+        head = b"".join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode()
+            for k, v in fields.items())
+        head += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+                 f'filename="{os.path.basename(path)}"\r\n'
+                 f"Content-Type: application/octet-stream\r\n\r\n").encode()
+        self._parts = [head, path, f"\r\n--{self.boundary}--\r\n".encode()]
+        self._len = len(head) + os.path.getsize(path) + len(self._parts[2])
+        self._file = None
+        self._buf = b""
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return self._len
+
+    def _next_chunk(self):
+        while self._parts or self._file:
+            if self._file:
+                data = self._file.read(CHUNK)
+                if data:
+                    return data
+                self._file.close(); self._file = None
+                continue
+            part = self._parts.pop(0)
+            if isinstance(part, bytes):
+                return part
+            self._file = open(part, "rb")
+        return b""
+
+    def read(self, n=-1):
+        while n < 0 or len(self._buf) < n:
+            chunk = self._next_chunk()
+            if not chunk:
+                break
+            self._buf += chunk
+        if n < 0:
+            out, self._buf = self._buf, b""
+        else:
+            out, self._buf = self._buf[:n], self._buf[n:]
+        return out
+
+    def close(self):
+        if self._file:
+            self._file.close(); self._file = None
+
+# -------- UPLOADER --------
+class Uploader:
+    def __init__(self, endpoint=UPLOAD_URL, api_key=API_KEY, workers=8, max_pending=64,
+                 timeout=(5, 30), retries=3, backoff=0.5):
+        self.endpoint, self.api_key = endpoint, api_key
+        self.timeout, self.retries, self.backoff = timeout, retries, backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("http://", adapter); self.session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="upload")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _post(self, local_path):
+        body = MultipartStream({"key": self.api_key}, "image", local_path)
+        try:
+            return self.session.post(self.endpoint, data=body, timeout=self.timeout,
+                                     headers={"Content-Type": body.content_type})
+        finally:
+            body.close()
+
+    def _delay(self, attempt, resp=None):
+        retry_after = resp is not None and resp.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * (2 ** attempt) * (1 + random.random() / 2)
+
+    def upload(self, local_path):
+        # returns the hosted URL, or None once retries are exhausted
+        for attempt in range(self.retries + 1):
+            resp = None
+            try:
+                resp = self._post(local_path)
+                if resp.status_code == 200:
+                    return resp.json()["data"]["url"]
+                if resp.status_code not in RETRY_STATUS:
+                    print("Upload failed:", resp.text)
+                    return None
+                err = f"HTTP {resp.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                err = e
+            except Exception as e:
+                print("Upload error:", e)
+                return None
+            if attempt < self.retries:
+                time.sleep(self._delay(attempt, resp))
+        print("Upload error:", err)
+        return None
+
+    def submit(self, local_path):
+        # blocks while max_pending uploads are queued or running
+        self._slots.acquire()
+        try:
+            fut = self._pool.submit(self.upload, local_path)
+        except BaseException:
+            self._slots.release(); raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        return fut
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        self.session.close()
+
+_default = None
+_default_lock = threading.Lock()
+
+def get_uploader():
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Uploader()
+        return _default
+
+def set_uploader(uploader):
+    # swap the process-wide uploader, e.g. to point at a local stand-in server
+    global _default
+    with _default_lock:
+        old, _default = _default, uploader
+    if old is not None and old is not uploader:
+        old.close()